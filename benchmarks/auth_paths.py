@@ -0,0 +1,247 @@
+"""Нагрузочные замеры горячих путей аутентификации и проверки прав
+
+Для каждого размера набора данных (синтетические пользователи из
+populate_data.generate_dataset) измеряет p50/p95/p99 и пропускную способность:
+вход, запрос с токеном через AuthenticationMiddleware (с кешем токенов и без),
+check_permission с холодной и теплой матрицей прав, выход и регистрацию.
+Работает с БД из настроек Django (PostgreSQL или SQLite) и использует
+отдельную тестовую базу, которая удаляется после замера.
+
+    python benchmarks/auth_paths.py --sizes 1000,10000,100000 --output results.json
+    python benchmarks/auth_paths.py --baseline benchmarks/baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+
+from core.hashing import configured_rounds
+from core.models import CustomUser, Role
+from core.permissions import permission_matrix
+from core.ratelimit import login_rate_limiter
+from core.token_cache import token_cache
+from core.utils import check_permission, get_user_from_token, issue_tokens, new_session
+from populate_data import generate_dataset, populate_data
+
+BENCH_EMAIL = 'bench@example.com'
+BENCH_PASSWORD = 'bench123'
+
+
+def summarize(timings):
+    timings = sorted(timings)
+
+    def percentile(q):
+        return timings[min(len(timings) - 1, int(len(timings) * q))] * 1000
+
+    total = sum(timings)
+    return {
+        'iterations': len(timings),
+        'p50_ms': statistics.median(timings) * 1000,
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'mean_ms': total / len(timings) * 1000,
+        'throughput_rps': len(timings) / total if total else 0.0,
+    }
+
+
+def measure(func, iterations, setup=None, warmup=1):
+    """Время каждого вызова func(i); setup(i) и прогрев выполняются вне замера"""
+    for i in range(iterations, iterations + warmup):
+        if setup is not None:
+            setup(i)
+        func(i)
+
+    timings = []
+    for i in range(iterations):
+        if setup is not None:
+            setup(i)
+        started = time.perf_counter()
+        func(i)
+        timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def expect(response, status):
+    if response.status_code != status:
+        raise RuntimeError(f'Ожидался статус {status}, получен {response.status_code}: {response.content[:200]!r}')
+
+
+def issue_token(user):
+    """Access-токен с сессией, как при входе, но без проверки пароля"""
+    session = new_session(user)
+    session.save()
+    return issue_tokens(user, session)['token']
+
+
+def run_scenarios(size, iterations, bcrypt_iterations):
+    client = Client()
+    factory = RequestFactory()
+    user = CustomUser.objects.get(email=BENCH_EMAIL)
+    token = issue_token(user)
+    auth_header = f'Bearer {token}'
+    results = {}
+
+    def login(i):
+        expect(client.post('/api/login/', {'email': BENCH_EMAIL, 'password': BENCH_PASSWORD},
+                           content_type='application/json'), 200)
+
+    # Счетчики попыток сбрасываются, чтобы серия входов с одного IP не упиралась в лимит
+    results['login'] = measure(login, bcrypt_iterations, setup=lambda i: login_rate_limiter.clear())
+
+    def auth_request(i):
+        expect(client.get('/api/profile/', HTTP_AUTHORIZATION=auth_header), 200)
+
+    results['auth_request_warm'] = measure(auth_request, iterations)
+    results['auth_request_cold'] = measure(auth_request, iterations, setup=lambda i: token_cache.clear())
+
+    request = factory.get('/api/profile/', HTTP_AUTHORIZATION=auth_header)
+
+    def resolve_user(i):
+        if get_user_from_token(request) is None:
+            raise RuntimeError('Токен не принят')
+
+    results['get_user_from_token_cold'] = measure(resolve_user, iterations, setup=lambda i: token_cache.clear())
+
+    def permission(i):
+        if not check_permission(user, 'products', 'read'):
+            raise RuntimeError('Нет права products.read')
+
+    results['check_permission_cold'] = measure(permission, iterations, setup=lambda i: permission_matrix.invalidate())
+    results['check_permission_warm'] = measure(permission, iterations)
+
+    logout_tokens = {}
+
+    def prepare_logout(i):
+        logout_tokens[i] = issue_token(user)
+
+    def logout(i):
+        expect(client.post('/api/logout/', HTTP_AUTHORIZATION=f'Bearer {logout_tokens.pop(i)}'), 200)
+
+    results['logout'] = measure(logout, iterations, setup=prepare_logout)
+
+    def register(i):
+        expect(client.post('/api/register/', {
+            'email': f'register{size}_{i}@bench.example.com',
+            'password': BENCH_PASSWORD,
+            'password_confirm': BENCH_PASSWORD,
+            'first_name': 'Bench',
+            'last_name': 'User',
+        }, content_type='application/json'), 201)
+
+    results['register'] = measure(register, bcrypt_iterations)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Сценарии, у которых p95 вырос больше чем на threshold относительно базовой линии
+
+    Изменения меньше min_delta_ms не считаются регрессией: у микросекундных
+    сценариев относительный шум слишком велик.
+    """
+    regressions = []
+    print(f"\n{'размер':>8} {'сценарий':<26} {'база p95':>10} {'p95':>10} {'изм.':>8}")
+    for size, scenarios in results['results'].items():
+        for name, current in scenarios.items():
+            reference = baseline.get('results', {}).get(size, {}).get(name)
+            if reference is None:
+                continue
+            ratio = current['p95_ms'] / reference['p95_ms'] if reference['p95_ms'] else 1.0
+            mark = ''
+            if ratio > 1 + threshold and current['p95_ms'] - reference['p95_ms'] > min_delta_ms:
+                regressions.append((size, name, ratio))
+                mark = ' !'
+            print(f"{size:>8} {name:<26} {reference['p95_ms']:>10.2f} {current['p95_ms']:>10.2f} "
+                  f"{(ratio - 1) * 100:>+7.0f}%{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='Размеры набора данных (число пользователей) через запятую')
+    parser.add_argument('--roles', type=int, default=20)
+    parser.add_argument('--elements', type=int, default=20)
+    parser.add_argument('--rule-density', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--bcrypt-iterations', type=int, default=20,
+                        help='Итераций для сценариев с bcrypt (вход и регистрация)')
+    parser.add_argument('--output', help='Файл для результатов в JSON')
+    parser.add_argument('--baseline', help='JSON с результатами прошлого замера для сравнения')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Допустимый рост p95 относительно базовой линии (0.2 = 20%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='Рост p95 меньше этого значения не считается регрессией')
+    parser.add_argument('--keepdb', action='store_true', help='Не удалять тестовую базу после замера')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb)
+    try:
+        populate_data()
+        if not CustomUser.objects.filter(email=BENCH_EMAIL).exists():
+            CustomUser.objects.create_user(email=BENCH_EMAIL, password=BENCH_PASSWORD,
+                                           role=Role.objects.get(name='user'))
+
+        results = {}
+        for size in sizes:
+            # Набор данных растет от размера к размеру: существующие строки не пересоздаются
+            print(f'Подготовка набора данных: {size} пользователей ({connection.vendor})')
+            generate_dataset(users=size, roles=args.roles, elements=args.elements,
+                             rule_density=args.rule_density, seed=args.seed)
+            print(f'Замер на {size} пользователях')
+            results[str(size)] = run_scenarios(size, args.iterations, args.bcrypt_iterations)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+
+    report = {
+        'meta': {
+            'vendor': connection.vendor,
+            'python': platform.python_version(),
+            'bcrypt_rounds': configured_rounds(),
+            'jwt_embed_claims': settings.JWT_EMBED_CLAIMS,
+            'iterations': args.iterations,
+            'bcrypt_iterations': args.bcrypt_iterations,
+            'created_at': timezone.now().isoformat(),
+        },
+        'results': results,
+    }
+
+    print(f"\n{'размер':>8} {'сценарий':<26} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'запр./с':>9}")
+    for size, scenarios in results.items():
+        for name, stats in scenarios.items():
+            print(f"{size:>8} {name:<26} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                  f"{stats['p99_ms']:>9.2f} {stats['throughput_rps']:>9.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f'\nРегрессия p95 больше {args.threshold:.0%} в {len(regressions)} сценариях')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
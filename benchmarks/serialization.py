@@ -0,0 +1,146 @@
+"""Стоимость сериализации ответов горячих эндпоинтов до и после
+
+"до" - прежний код представлений: ModelSerializer или словарь, собранный
+из объекта модели, и стандартные JSONRenderer/JSONParser из DRF; "после" -
+ответы из строк .values() (core.serializers) и JSON из core.renderers
+(orjson и стандартный json). Измеряется только построение ответа и JSON,
+без БД: объекты и строки создаются в памяти.
+
+    python benchmarks/serialization.py --iterations 5000 --rows 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from io import BytesIO
+
+from rest_framework import serializers
+from rest_framework.parsers import JSONParser as DRFJSONParser
+from rest_framework.renderers import JSONRenderer as DRFJSONRenderer
+
+from core import renderers
+from core.models import AccessRoleRule, BusinessElement, CustomUser, Role
+from core.permissions import RULE_FIELDS
+from core.serializers import (
+    PROFILE_FIELDS, AccessRoleRuleSerializer, RoleSerializer, UserLoginSerializer, UserUpdateSerializer,
+    login_data, profile_data
+)
+
+
+class NamedRuleSerializer(AccessRoleRuleSerializer):
+    """Правило с именами роли и элемента через ModelSerializer (прежний вариант списка)"""
+    role_name = serializers.CharField(source='role.name', read_only=True)
+    business_element_name = serializers.CharField(source='business_element.name', read_only=True)
+
+
+def legacy_login_response(user, tokens):
+    """Ответ на вход, как его собирало представление до core.serializers.login_data"""
+    return {
+        **tokens,
+        'user': {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name
+        }
+    }
+
+
+def measure(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_us': statistics.median(timings) * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99) - 1] * 1e6,
+    }
+
+
+def make_fixtures(rows):
+    user = CustomUser(id=12345, email='user12345@example.com', first_name='Иван', last_name='Петров')
+    # Строка, которую профиль читает через .values(PROFILE_FIELDS)
+    profile_row = {field: getattr(user, field) for field in PROFILE_FIELDS}
+    tokens = {'token': 'a' * 400, 'refresh': 'b' * 300}
+    roles = [Role(id=i, name=f'role_{i}', description=f'Роль номер {i}') for i in range(1, rows + 1)]
+    role_rows = [{'id': role.id, 'name': role.name, 'description': role.description} for role in roles]
+    rules = []
+    rule_rows = []
+    for i in range(1, rows + 1):
+        role = roles[i % len(roles)]
+        element = BusinessElement(id=i, name=f'element_{i}')
+        flags = {field: bool((i >> bit) & 1) for bit, field in enumerate(RULE_FIELDS)}
+        rules.append(AccessRoleRule(id=i, role=role, business_element=element, **flags))
+        rule_rows.append({
+            'id': i, 'role': role.id, 'business_element': element.id,
+            **flags, 'role_name': role.name, 'business_element_name': element.name,
+        })
+    login_body = b'{"email":"user12345@example.com","password":"correct horse battery staple"}'
+    return user, profile_row, tokens, roles, role_rows, rules, rule_rows, login_body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=100, help='Строк в списках ролей и правил')
+    args = parser.parse_args()
+
+    user, profile_row, tokens, roles, role_rows, rules, rule_rows, login_body = make_fixtures(args.rows)
+    drf_render = DRFJSONRenderer().render
+    drf_parse = DRFJSONParser().parse
+
+    backends = {'stdlib': (renderers.stdlib_dumps, renderers.json.loads)}
+    if renderers.orjson is not None:
+        backends['orjson'] = (renderers.orjson_dumps, renderers.orjson.loads)
+
+    def validate_login(data):
+        serializer = UserLoginSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    cases = {
+        'профиль': [
+            ('DRF', lambda: drf_render(UserUpdateSerializer(user).data)),
+        ],
+        'ответ на вход': [
+            ('DRF', lambda: drf_render(legacy_login_response(user, tokens))),
+        ],
+        'запрос на вход': [
+            ('DRF', lambda: validate_login(drf_parse(BytesIO(login_body)))),
+        ],
+        f'роли, {args.rows} строк': [
+            ('DRF', lambda: drf_render(RoleSerializer(roles, many=True).data)),
+        ],
+        f'правила, {args.rows} строк': [
+            ('DRF', lambda: drf_render(NamedRuleSerializer(rules, many=True).data)),
+        ],
+    }
+    for backend, (dumps, loads) in backends.items():
+        cases['профиль'].append((backend, lambda dumps=dumps: dumps(profile_data(profile_row))))
+        cases['ответ на вход'].append((backend, lambda dumps=dumps: dumps(login_data(user, tokens))))
+        cases['запрос на вход'].append((backend, lambda loads=loads: validate_login(loads(login_body))))
+        cases[f'роли, {args.rows} строк'].append((backend, lambda dumps=dumps: dumps(role_rows)))
+        cases[f'правила, {args.rows} строк'].append((backend, lambda dumps=dumps: dumps(rule_rows)))
+
+    print(f"{'ответ':<22} {'вариант':<8} {'p50, мкс':>10} {'p99, мкс':>10} {'ускорение':>10}")
+    for name, variants in cases.items():
+        baseline = None
+        for variant, func in variants:
+            result = measure(func, args.iterations)
+            baseline = baseline or result['p50_us']
+            print(f"{name:<22} {variant:<8} {result['p50_us']:>10.1f} {result['p99_us']:>10.1f} "
+                  f"{baseline / result['p50_us']:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Сравнение ключей сессий: полная строка JWT против 16-байтного jti
+
+Создает две временные таблицы, заполняет их N строками и измеряет размер
+уникального индекса и задержку поиска по ключу. Работает с БД из настроек
+Django (PostgreSQL или SQLite).
+
+    python benchmarks/session_keys.py --rows 10000000
+"""
+import argparse
+import base64
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection
+
+TOKEN_TABLE = 'bench_session_token'
+JTI_TABLE = 'bench_session_jti'
+JWT_HEADER = 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9'
+
+
+def fake_token(rng):
+    """Строка размером с настоящий JWT (около 250 символов)"""
+    payload = base64.urlsafe_b64encode(rng.randbytes(135)).decode().rstrip('=')
+    signature = base64.urlsafe_b64encode(rng.randbytes(32)).decode().rstrip('=')
+    return f'{JWT_HEADER}.{payload}.{signature}'
+
+
+def create_tables(cursor):
+    key_type = 'bytea' if connection.vendor == 'postgresql' else 'blob'
+    for table in (TOKEN_TABLE, JTI_TABLE):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    cursor.execute(f'CREATE TABLE {TOKEN_TABLE} (id integer PRIMARY KEY, token varchar(500) NOT NULL UNIQUE)')
+    cursor.execute(f'CREATE TABLE {JTI_TABLE} (id integer PRIMARY KEY, jti {key_type} NOT NULL UNIQUE)')
+
+
+def fill(cursor, rows, batch_size, rng, sample_size):
+    token_samples, jti_samples = [], []
+    sample_every = max(1, rows // sample_size)
+    for start in range(0, rows, batch_size):
+        token_batch, jti_batch = [], []
+        for row_id in range(start, min(start + batch_size, rows)):
+            token = fake_token(rng)
+            jti = uuid.UUID(int=rng.getrandbits(128)).bytes
+            token_batch.append((row_id, token))
+            jti_batch.append((row_id, jti))
+            if row_id % sample_every == 0:
+                token_samples.append(token)
+                jti_samples.append(jti)
+        cursor.executemany(f'INSERT INTO {TOKEN_TABLE} (id, token) VALUES (%s, %s)', token_batch)
+        cursor.executemany(f'INSERT INTO {JTI_TABLE} (id, jti) VALUES (%s, %s)', jti_batch)
+        print(f'  вставлено {min(start + batch_size, rows)} / {rows}', end='\r', flush=True)
+    print()
+    return token_samples, jti_samples
+
+
+def index_size(cursor, table):
+    """Размер индексов таблицы в байтах (None, если СУБД его не сообщает)"""
+    if connection.vendor == 'postgresql':
+        cursor.execute(
+            'SELECT COALESCE(SUM(pg_relation_size(indexrelid)), 0) FROM pg_index WHERE indrelid = %s::regclass',
+            [table],
+        )
+        return cursor.fetchone()[0]
+    try:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+            [table],
+        )
+    except Exception:
+        # SQLite собран без dbstat
+        return None
+    return cursor.fetchone()[0]
+
+
+def measure_lookups(cursor, table, column, keys):
+    timings = []
+    for key in keys:
+        started = time.perf_counter()
+        cursor.execute(f'SELECT id FROM {table} WHERE {column} = %s', [key])
+        cursor.fetchone()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_us': statistics.median(timings) * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99) - 1] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='Не удалять таблицы после замера')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with connection.cursor() as cursor:
+        create_tables(cursor)
+        print(f'Заполнение {args.rows} строк ({connection.vendor})')
+        token_keys, jti_keys = fill(cursor, args.rows, args.batch_size, rng, args.lookups)
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'ANALYZE {TOKEN_TABLE}')
+            cursor.execute(f'ANALYZE {JTI_TABLE}')
+
+        random.Random(args.seed).shuffle(token_keys)
+        random.Random(args.seed).shuffle(jti_keys)
+        results = {
+            'token varchar(500)': (index_size(cursor, TOKEN_TABLE),
+                                   measure_lookups(cursor, TOKEN_TABLE, 'token', token_keys)),
+            'jti 16 bytes': (index_size(cursor, JTI_TABLE),
+                             measure_lookups(cursor, JTI_TABLE, 'jti', jti_keys)),
+        }
+
+        if not args.keep:
+            cursor.execute(f'DROP TABLE {TOKEN_TABLE}')
+            cursor.execute(f'DROP TABLE {JTI_TABLE}')
+
+    print(f"{'ключ':<20} {'индексы, МБ':>12} {'p50, мкс':>10} {'p99, мкс':>10}")
+    for name, (size, latency) in results.items():
+        size_mb = f'{size / 2 ** 20:.1f}' if size is not None else 'н/д'
+        print(f"{name:<20} {size_mb:>12} {latency['p50_us']:>10.1f} {latency['p99_us']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
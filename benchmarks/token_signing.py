@@ -0,0 +1,109 @@
+"""Стоимость подписи и проверки JWT по алгоритмам
+
+Сравнивает HS256 с асимметричными EdDSA (Ed25519), ES256 (P-256) и RS256
+(RSA 2048) на payload, как у access-токена приложения. Для асимметричных
+алгоритмов также измеряется вариант с разбором PEM при каждом вызове,
+которого избегает кольцо ключей core.keys.
+
+    python benchmarks/token_signing.py --iterations 5000
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+SECRET = 'x' * 50
+
+
+def make_payload():
+    now = int(time.time())
+    return {
+        'user_id': 12345,
+        'email': 'user12345@example.com',
+        'exp': now + 300,
+        'iat': now,
+        'jti': uuid.uuid4().hex,
+        'type': 'access',
+        'sid': uuid.uuid4().hex,
+        'role_id': 3,
+        'is_staff': False,
+        'is_superuser': False,
+        'epoch': 0,
+    }
+
+
+def private_pem(key):
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption())
+
+
+def public_pem(key):
+    return key.public_key().public_bytes(serialization.Encoding.PEM,
+                                         serialization.PublicFormat.SubjectPublicKeyInfo)
+
+
+def measure(func, iterations):
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'p50_us': statistics.median(timings) * 1e6,
+        'p99_us': timings[int(len(timings) * 0.99) - 1] * 1e6,
+        'ops': len(timings) / sum(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = make_payload()
+    keys = {
+        'EdDSA': ed25519.Ed25519PrivateKey.generate(),
+        'ES256': ec.generate_private_key(ec.SECP256R1()),
+        'RS256': rsa.generate_private_key(public_exponent=65537, key_size=2048),
+    }
+
+    cases = {}
+    token = jwt.encode(payload, SECRET, algorithm='HS256')
+    cases['HS256'] = (
+        lambda: jwt.encode(payload, SECRET, algorithm='HS256'),
+        lambda token=token: jwt.decode(token, SECRET, algorithms=['HS256']),
+    )
+    for algorithm, key in keys.items():
+        public_key = key.public_key()
+        token = jwt.encode(payload, key, algorithm=algorithm, headers={'kid': 'bench'})
+        cases[algorithm] = (
+            lambda key=key, algorithm=algorithm: jwt.encode(payload, key, algorithm=algorithm,
+                                                            headers={'kid': 'bench'}),
+            lambda token=token, public_key=public_key, algorithm=algorithm: jwt.decode(
+                token, public_key, algorithms=[algorithm]),
+        )
+        # Ключ передается строкой PEM: PyJWT разбирает его при каждом вызове
+        cases[f'{algorithm} (PEM)'] = (
+            lambda pem=private_pem(key), algorithm=algorithm: jwt.encode(payload, pem, algorithm=algorithm,
+                                                                         headers={'kid': 'bench'}),
+            lambda token=token, pem=public_pem(key), algorithm=algorithm: jwt.decode(
+                token, pem, algorithms=[algorithm]),
+        )
+
+    print(f"{'алгоритм':<14} {'подпись p50, мкс':>17} {'p99':>8} {'в сек.':>8}  "
+          f"{'проверка p50, мкс':>18} {'p99':>8} {'в сек.':>8}  {'длина':>6}")
+    for name, (sign, verify) in cases.items():
+        signed = measure(sign, args.iterations)
+        verified = measure(verify, args.iterations)
+        length = len(sign())
+        print(f"{name:<14} {signed['p50_us']:>17.1f} {signed['p99_us']:>8.1f} {signed['ops']:>8.0f}  "
+              f"{verified['p50_us']:>18.1f} {verified['p99_us']:>8.1f} {verified['ops']:>8.0f}  {length:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Фоновая очистка сессий только в процессах, обслуживающих запросы (если включена в SESSION_REAPER)
+from core.reaper import periodic_reaper  # noqa: E402
+
+periodic_reaper.start()
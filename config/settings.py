@@ -25,6 +25,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -58,7 +60,8 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Бэкенд PostgreSQL с метрикой времени получения соединения (db_connect_duration_seconds)
+        'ENGINE': 'core.db.backends.postgresql',
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
@@ -67,6 +70,46 @@ DATABASES = {
     }
 }
 
+# Пул соединений psycopg 3 на воркер; без пула соединение живет CONN_MAX_AGE секунд
+DB_POOL = {
+    'ENABLED': True if os.getenv('DB_POOL') == 'True' else False,
+    'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE') or 2),
+    'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE') or 10),
+    # Сколько ждать свободного соединения, сек
+    'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT') or 5),
+}
+if DB_POOL['ENABLED']:
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': DB_POOL['MIN_SIZE'],
+            'max_size': DB_POOL['MAX_SIZE'],
+            'timeout': DB_POOL['TIMEOUT'],
+            # Проверка соединения при выдаче из пула
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE') or 60)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Реплики для чтений аутентификации (core.routers): хосты через запятую в DB_REPLICA_HOSTS
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+DATABASE_REPLICATION = {
+    'REPLICAS': [alias for alias in DATABASES if alias.startswith('replica')],
+    # Сколько секунд после входа или изменения читать данные пользователя с основной БД
+    'PIN_SECONDS': int(os.getenv('DB_REPLICA_PIN_SECONDS') or 5),
+    'CACHE_ALIAS': 'default',
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -94,16 +137,132 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'core.renderers.JSONParser',
     ],
 }
 
+# JSON API: 'auto' - orjson, если установлен, иначе стандартный json; 'orjson' или 'stdlib' - явно
+JSON_BACKEND = os.getenv('JSON_BACKEND') or 'auto'
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+
+# Матрица прав: версия хранится в кеше, общем для всех воркеров
+# (для нескольких процессов нужен разделяемый бэкенд кеша, например Redis)
+PERMISSION_MATRIX_CACHE_ALIAS = 'default'
+PERMISSION_MATRIX_CHECK_INTERVAL = 1.0
+
+# Время жизни access-токена и сессии (refresh-токенов), сек
+JWT_ACCESS_TOKEN_LIFETIME = int(os.getenv('JWT_ACCESS_TOKEN_LIFETIME') or 300)
+JWT_REFRESH_TOKEN_LIFETIME = int(os.getenv('JWT_REFRESH_TOKEN_LIFETIME') or 86400)
+
+# Подпись токенов. Без ACTIVE_KID - HS256 с SECRET_KEY; с ACTIVE_KID - ключом <kid>.pem
+# из KEYS_DIR (EdDSA, RS256 или ES256), открытые ключи публикуются в /.well-known/jwks.json.
+# Ключи создаются командой manage.py signing_keys
+JWT_SIGNING = {
+    'KEYS_DIR': os.getenv('JWT_KEYS_DIR') or BASE_DIR / 'keys',
+    'ACTIVE_KID': os.getenv('JWT_ACTIVE_KID') or None,
+}
+
+# Токен содержит role_id, is_staff, is_superuser и эпоху пользователя:
+# middleware аутентифицирует запрос без SELECT пользователя
+JWT_EMBED_CLAIMS = True if os.getenv('JWT_EMBED_CLAIMS') == 'True' else False
+AUTH_EPOCH_CACHE_ALIAS = 'default'
+# Время жизни эпохи в кеше, сек: при кеше в памяти процесса - максимальная задержка,
+# с которой другие воркеры отклонят токены деактивированного пользователя.
+# None допустимо только для кеша, общего для всех воркеров (Redis, Memcached)
+AUTH_EPOCH_CACHE_TIMEOUT = 30
+
+# Размер LRU-кеша проверенных токенов в процессе (0 - кеш отключен). Кеш избавляет от повторной
+# проверки подписи; без JWT_EMBED_CLAIMS пользователь по-прежнему читается из БД на каждом запросе,
+# с claims деактивация видна другим воркерам через AUTH_EPOCH_CACHE_TIMEOUT
+TOKEN_CACHE_MAX_SIZE = 10000
+
+# Отозванные токены (по jti). Для нескольких воркеров:
+# 'BACKEND': 'core.revocation.SocketRevocationBackend' и manage.py sharedstore
+TOKEN_REVOCATION = {
+    'BACKEND': 'core.revocation.LocalRevocationBackend',
+    'OPTIONS': {},
+    # Максимальная задержка распространения отзыва между воркерами, сек
+    'SYNC_INTERVAL': 1.0,
+}
+
+# Пул для bcrypt: при заполненной очереди вход и регистрация отвечают 503
+PASSWORD_HASHING = {
+    'EXECUTOR': 'thread',  # 'thread' или 'process'
+    'WORKERS': None,  # по умолчанию число ядер
+    'MAX_QUEUE': 64,
+    'RETRY_AFTER': 1,
+}
+
+# Ограничение попыток входа по email и IP (до чтения пользователя и bcrypt).
+# Для нескольких воркеров: 'BACKEND': 'core.ratelimit.SocketRateLimitBackend' и manage.py sharedstore
+LOGIN_RATE_LIMIT = {
+    'ENABLED': True,
+    'BACKEND': 'core.ratelimit.LocalRateLimitBackend',
+    'OPTIONS': {},
+    'EMAIL': {'LIMIT': 5, 'WINDOW': 60},
+    'IP': {'LIMIT': 50, 'WINDOW': 60},
+    # Первая блокировка, сек; каждая следующая вдвое дольше, но не дольше MAX_LOCKOUT
+    'LOCKOUT': 30,
+    'MAX_LOCKOUT': 3600,
+    # IP клиента из X-Forwarded-For (только за доверенным прокси)
+    'USE_X_FORWARDED_FOR': False,
+}
+
+# Стоимость bcrypt (подбирается командой manage.py calibrate_password_cost)
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS') or 12)
+
+# Очистка сессий (manage.py reap_sessions или фоновый поток при ENABLED)
+SESSION_REAPER = {
+    'ENABLED': False,
+    'INTERVAL': 300,
+    'BATCH_SIZE': 1000,
+    'BATCH_PAUSE': 0.0,
+    # Пауза, пока отставание реплик больше этого значения, сек
+    'MAX_REPLICATION_LAG': 5.0,
+}
+
+# Кеш ответа GET /api/profile/ по пользователю (core.profile_cache). Сброс записи при сохранении
+# пользователя виден другим воркерам только в общем кеше (Redis, Memcached): с кешем в памяти
+# процесса manage.py check предупреждает (core.W001). Без кеша профиль читается одним запросом
+PROFILE_CACHE = {
+    'ENABLED': True if os.getenv('PROFILE_CACHE') == 'True' else False,
+    'ALIAS': 'default',
+    # Запись сбрасывается при сохранении пользователя и истекает при изменениях через QuerySet.update(), сек
+    'TIMEOUT': 300,
+}
+
+# Отложенная запись сессий при входе (core.session_recorder)
+SESSION_WRITE_BEHIND = {
+    'ENABLED': True if os.getenv('SESSION_WRITE_BEHIND') == 'True' else False,
+    # Запись очереди раз в INTERVAL секунд или по накоплении BATCH_SIZE сессий
+    'INTERVAL': 0.05,
+    'BATCH_SIZE': 500,
+    # Журнал еще не записанных сессий на случай завершения процесса
+    'JOURNAL_DIR': os.getenv('SESSION_JOURNAL_DIR') or BASE_DIR / 'var' / 'sessions',
+    'FSYNC': False,
+}
+
+# Секционирование сессий по expires_at (PostgreSQL, manage.py partition_sessions)
+SESSION_PARTITIONING = {
+    'ENABLED': False,
+    'MONTHS_AHEAD': 3,
+}
+
+# Асинхронные представления аутентификации и профиля (для запуска под ASGI, например uvicorn)
+ASYNC_VIEWS = True if os.getenv('ASYNC_VIEWS') == 'True' else False
+
+# Замеры фаз запроса (auth, permission, password, view) в /api/metrics/;
+# SERVER_TIMING добавляет их в заголовок Server-Timing ответа
+INSTRUMENTATION = {
+    'ENABLED': True if os.getenv('INSTRUMENTATION') == 'True' else False,
+    'SERVER_TIMING': True if os.getenv('SERVER_TIMING') == 'True' else False,
+}
@@ -0,0 +1,279 @@
+"""Асинхронные варианты представлений для запуска под ASGI (ASYNC_VIEWS=True)
+
+Аутентификация, профиль и проверка прав выполняются в цикле событий через
+асинхронный ORM. Хеширование bcrypt ожидается в пуле password_hasher.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import HttpResponse
+from django.views import View
+
+from .auth import TokenPrincipal
+from .hashing import HashingPoolSaturated
+from .models import CustomUser, UserSession
+from .permissions import permission_matrix
+from .profile_cache import acached_profile, profile_response
+from .ratelimit import login_rate_limiter
+from .renderers import dumps, loads
+from .revocation import revocation_set
+from .session_recorder import session_recorder
+from .serializers import (
+    TokenRefreshSerializer, UserLoginSerializer, UserRegistrationSerializer, UserUpdateSerializer, login_data
+)
+from .token_cache import token_cache
+from .policies import route_policy
+from .utils import (
+    aclose_session, aprofile_permissions, arotate_refresh_token, get_session_key,
+    get_token_from_request, issue_tokens, new_session, revoke_token
+)
+
+
+def json_response(data, status=200, headers=None):
+    # Тот же формат и бэкенд JSON, что у API на DRF (core.renderers)
+    return HttpResponse(dumps(data), status=status, headers=headers, content_type='application/json')
+
+
+def parse_json(request):
+    try:
+        data = loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def overloaded_response(exc):
+    """Ответ 503, когда пул хеширования паролей перегружен"""
+    return json_response(
+        {'error': 'Сервис перегружен, повторите попытку позже'},
+        status=503,
+        headers={'Retry-After': str(exc.retry_after)}
+    )
+
+
+def rate_limited_response(retry_after):
+    """Ответ 429, когда превышен лимит попыток входа"""
+    return json_response(
+        {'error': 'Слишком много попыток входа, повторите попытку позже'},
+        status=429,
+        headers={'Retry-After': str(retry_after)}
+    )
+
+
+def bad_json_response():
+    return json_response({'error': 'Некорректный JSON'}, status=400)
+
+
+def user_deleted_response():
+    """Ответ 401, когда пользователь удален, а его токен с claims еще проходит проверку эпохи"""
+    return json_response({'error': 'Требуется аутентификация'}, status=401)
+
+
+async def aload_user(user):
+    """Полный объект CustomUser для пользователя запроса"""
+    if isinstance(user, TokenPrincipal):
+        return await user.aget_user()
+    return user
+
+
+@route_policy(public=True)
+class AsyncRegisterView(View):
+    """Регистрация пользователя"""
+
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_json_response()
+
+        serializer = UserRegistrationSerializer(data=data)
+        # Проверка уникальности email обращается к БД синхронно
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response(serializer.errors, status=400)
+
+        validated = serializer.validated_data
+        user = CustomUser(
+            email=CustomUser.objects.normalize_email(validated['email']),
+            first_name=validated.get('first_name', ''),
+            last_name=validated.get('last_name', ''),
+        )
+        try:
+            await user.aset_password(validated['password'])
+        except HashingPoolSaturated as e:
+            return overloaded_response(e)
+
+        try:
+            await user.asave()
+        except IntegrityError:
+            return json_response({'email': ['Пользователь с таким email уже существует']}, status=400)
+
+        return json_response({
+            'message': 'Пользователь успешно зарегистрирован',
+            'user_id': user.id
+        }, status=201)
+
+
+@route_policy(public=True)
+class AsyncLoginView(View):
+    """Вход в систему"""
+
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_json_response()
+
+        serializer = UserLoginSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+
+        email = serializer.validated_data['email']
+        password = serializer.validated_data['password']
+
+        # Лимит проверяется до обращения к БД и bcrypt
+        retry_after = await login_rate_limiter.acheck(request, email)
+        if retry_after:
+            return rate_limited_response(retry_after)
+
+        try:
+            user = await CustomUser.objects.aget(email=email, is_active=True)
+        except CustomUser.DoesNotExist:
+            return json_response({'error': 'Неверные учетные данные'}, status=401)
+
+        try:
+            password_valid = await user.acheck_password(password)
+        except HashingPoolSaturated as e:
+            return overloaded_response(e)
+
+        if not password_valid:
+            return json_response({'error': 'Неверные учетные данные'}, status=401)
+
+        # Пересоздаем хеш, если стоимость bcrypt в настройках изменилась
+        if user.password_needs_rehash():
+            try:
+                await user.aset_password(password)
+                await user.asave(update_fields=['password'])
+            except HashingPoolSaturated:
+                pass
+
+        await login_rate_limiter.areset(email)
+
+        session = new_session(user)
+        await session_recorder.arecord(session)
+
+        return json_response(login_data(user, issue_tokens(user, session)))
+
+
+@route_policy(public=True)
+class AsyncTokenRefreshView(View):
+    """Обмен refresh-токена на новую пару токенов"""
+
+    async def post(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_json_response()
+
+        serializer = TokenRefreshSerializer(data=data)
+        if not serializer.is_valid():
+            return json_response(serializer.errors, status=400)
+
+        tokens = await arotate_refresh_token(serializer.validated_data['refresh'])
+        if tokens is None:
+            return json_response({'error': 'Недействительный refresh-токен'}, status=401)
+        return json_response(tokens)
+
+
+class AsyncLogoutView(View):
+    """Выход из системы"""
+
+    async def post(self, request):
+        token = get_token_from_request(request)
+        if token:
+            # Бэкенд отзыва может обращаться к сети
+            await sync_to_async(revoke_token, thread_sensitive=False)(token)
+            await aclose_session(get_session_key(token))
+
+        return json_response({'message': 'Успешный выход из системы'})
+
+
+class AsyncUserProfileView(View):
+    """Профиль пользователя"""
+
+    async def get(self, request):
+        user_id = request.user.pk
+        try:
+            entry = await acached_profile(user_id)
+        except CustomUser.DoesNotExist:
+            return user_deleted_response()
+        return profile_response(request, user_id, entry, await permission_matrix.ashared_version())
+
+    async def put(self, request):
+        data = parse_json(request)
+        if data is None:
+            return bad_json_response()
+
+        try:
+            user = await aload_user(request.user)
+        except CustomUser.DoesNotExist:
+            return user_deleted_response()
+        serializer = UserUpdateSerializer(user, data=data, partial=True)
+        if not await sync_to_async(serializer.is_valid)():
+            return json_response(serializer.errors, status=400)
+
+        for field, value in serializer.validated_data.items():
+            setattr(user, field, value)
+        await user.asave(update_fields=[*serializer.validated_data, 'updated_at'])
+        return json_response(UserUpdateSerializer(user).data)
+
+
+class AsyncProfilePermissionsView(View):
+    """Все действующие права текущего пользователя одним запросом к снимку роли"""
+
+    async def get(self, request):
+        return json_response(await aprofile_permissions(request.user))
+
+
+class AsyncDeleteAccountView(View):
+    """Удаление аккаунта"""
+
+    async def post(self, request):
+        user = await aload_user(request.user)
+        user.is_active = False
+        await user.asave()
+
+        # Деактивируем все сессии пользователя и отзываем их sid: access- и refresh-токены
+        # этих сессий отклоняются во всех воркерах, не дожидаясь обновления эпохи
+        await session_recorder.aflush_pending(user_id=user.pk)
+        sessions = UserSession.objects.filter(user_id=user.pk, is_active=True)
+        revoked = [
+            (jti.hex, expires_at.timestamp())
+            async for jti, expires_at in sessions.values_list('jti', 'expires_at')
+        ]
+        for jti, expires_at in revoked:
+            await sync_to_async(revocation_set.revoke, thread_sensitive=False)(jti, expires_at)
+        await sessions.aupdate(is_active=False)
+        token_cache.discard_user(user.pk)
+
+        return json_response({'message': 'Аккаунт успешно удален'})
+
+
+@route_policy(element='users', action={'GET': 'read'})
+class AsyncUsersListView(View):
+    """Mock view для списка пользователей"""
+
+    async def get(self, request):
+        mock_data = [
+            {'id': 1, 'name': 'User 1', 'email': 'user1@example.com'},
+            {'id': 2, 'name': 'User 2', 'email': 'user2@example.com'},
+        ]
+        return json_response(mock_data)
+
+
+@route_policy(element='products', action={'GET': 'read'})
+class AsyncProductsListView(View):
+    """Mock view для списка товаров"""
+
+    async def get(self, request):
+        mock_data = [
+            {'id': 1, 'name': 'Product 1', 'price': 100},
+            {'id': 2, 'name': 'Product 2', 'price': 200},
+        ]
+        return json_response(mock_data)
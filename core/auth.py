@@ -0,0 +1,167 @@
+"""Эпоха аутентификации пользователя
+
+Эпоха из токена сверяется с текущей, которая хранится в кеше
+AUTH_EPOCH_CACHE_ALIAS. Запись кеша живет AUTH_EPOCH_CACHE_TIMEOUT секунд:
+при кеше в памяти процесса (LocMemCache) это предел, через который другие
+воркеры увидят деактивацию, смену роли или удаление пользователя, в том
+числе сделанные QuerySet.update() без сигналов.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Эпоха неактивного или удаленного пользователя: не совпадает ни с одной из токена
+INACTIVE_EPOCH = -1
+
+
+def _epoch_cache():
+    return caches[getattr(settings, 'AUTH_EPOCH_CACHE_ALIAS', 'default')]
+
+
+def _epoch_key(user_id):
+    return f'core:auth_epoch:{user_id}'
+
+
+def epoch_timeout():
+    return getattr(settings, 'AUTH_EPOCH_CACHE_TIMEOUT', 30)
+
+
+def get_auth_epoch(user_id):
+    """Текущая эпоха пользователя (из кеша, при промахе - из БД)"""
+    from .models import CustomUser
+
+    cache = _epoch_cache()
+    epoch = cache.get(_epoch_key(user_id))
+    if epoch is None:
+        epoch = (
+            CustomUser.objects.filter(id=user_id, is_active=True)
+            .values_list('auth_epoch', flat=True)
+            .first()
+        )
+        if epoch is None:
+            epoch = INACTIVE_EPOCH
+        cache.set(_epoch_key(user_id), epoch, timeout=epoch_timeout())
+    return epoch
+
+
+async def aget_auth_epoch(user_id):
+    """Асинхронный вариант get_auth_epoch"""
+    from .models import CustomUser
+
+    cache = _epoch_cache()
+    # Кеш в памяти процесса читаем напрямую: ввода-вывода нет, переход в поток не нужен
+    local = isinstance(cache, LocMemCache)
+    key = _epoch_key(user_id)
+    epoch = cache.get(key) if local else await cache.aget(key)
+    if epoch is None:
+        epoch = await (
+            CustomUser.objects.filter(id=user_id, is_active=True)
+            .values_list('auth_epoch', flat=True)
+            .afirst()
+        )
+        if epoch is None:
+            epoch = INACTIVE_EPOCH
+        if local:
+            cache.set(key, epoch, timeout=epoch_timeout())
+        else:
+            await cache.aset(key, epoch, timeout=epoch_timeout())
+    return epoch
+
+
+def publish_auth_epoch(user):
+    """Запись актуальной эпохи пользователя в кеш эпох"""
+    epoch = user.auth_epoch if user.is_active else INACTIVE_EPOCH
+    _epoch_cache().set(_epoch_key(user.pk), epoch, timeout=epoch_timeout())
+
+
+def publish_user_deleted(user_id):
+    """Эпоха удаленного пользователя: его токены с claims больше не проходят проверку"""
+    _epoch_cache().set(_epoch_key(user_id), INACTIVE_EPOCH, timeout=epoch_timeout())
+
+
+class TokenPrincipal:
+    """Пользователь запроса, собранный из claims токена без запроса к БД
+
+    Поля модели, которых нет в токене, загружают CustomUser при первом обращении.
+    """
+
+    # Поля, доступные без обращения к БД
+    CLAIM_FIELDS = ('id', 'role_id', 'is_staff', 'is_superuser', 'auth_epoch')
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, role_id, is_staff, is_superuser, auth_epoch):
+        object.__setattr__(self, '_user', None)
+        object.__setattr__(self, 'id', user_id)
+        object.__setattr__(self, 'role_id', role_id)
+        object.__setattr__(self, 'is_staff', is_staff)
+        object.__setattr__(self, 'is_superuser', is_superuser)
+        object.__setattr__(self, 'auth_epoch', auth_epoch)
+
+    @classmethod
+    def from_claims(cls, payload):
+        """Создание из payload токена; None, если claims неполные"""
+        if 'epoch' not in payload:
+            return None
+        return cls(
+            user_id=payload['user_id'],
+            role_id=payload.get('role_id'),
+            is_staff=bool(payload.get('is_staff')),
+            is_superuser=bool(payload.get('is_superuser')),
+            auth_epoch=payload['epoch'],
+        )
+
+    @classmethod
+    def from_user(cls, user):
+        """Создание из загруженного CustomUser"""
+        return cls(
+            user_id=user.pk,
+            role_id=user.role_id,
+            is_staff=user.is_staff,
+            is_superuser=user.is_superuser,
+            auth_epoch=user.auth_epoch,
+        )
+
+    def copy(self):
+        """Копия без загруженного CustomUser (для нового запроса)"""
+        return type(self)(self.id, self.role_id, self.is_staff, self.is_superuser, self.auth_epoch)
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def user(self):
+        """Полный объект CustomUser (загружается один раз)"""
+        if self._user is None:
+            from .models import CustomUser
+            object.__setattr__(self, '_user', CustomUser.objects.get(id=self.id))
+        return self._user
+
+    async def aget_user(self):
+        """Асинхронная загрузка полного объекта CustomUser"""
+        if self._user is None:
+            from .models import CustomUser
+            object.__setattr__(self, '_user', await CustomUser.objects.aget(id=self.id))
+        return self._user
+
+    def __getattr__(self, name):
+        # Вызывается только для атрибутов, которых нет в claims
+        return getattr(self.user, name)
+
+    def __setattr__(self, name, value):
+        # Изменения всегда применяются к модели, чтобы save() их сохранил
+        setattr(self.user, name, value)
+        if name in self.CLAIM_FIELDS or name == 'is_active':
+            object.__setattr__(self, name, value)
+
+    def __eq__(self, other):
+        return getattr(other, 'pk', None) == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return str(self.user)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Warning, register
+
+
+@register()
+def check_auth_epoch_cache(app_configs, **kwargs):
+    """Бессрочная эпоха в кеше процесса: другие воркеры не увидят деактивацию пользователя"""
+    alias = getattr(settings, 'AUTH_EPOCH_CACHE_ALIAS', 'default')
+    if getattr(settings, 'AUTH_EPOCH_CACHE_TIMEOUT', 30) is not None:
+        return []
+    if not isinstance(caches[alias], LocMemCache):
+        return []
+    return [Error(
+        f"AUTH_EPOCH_CACHE_TIMEOUT=None, но кеш '{alias}' хранится в памяти процесса",
+        hint='Задайте AUTH_EPOCH_CACHE_TIMEOUT в секундах или общий для воркеров кеш в AUTH_EPOCH_CACHE_ALIAS',
+        id='core.E001',
+    )]
+
+
+@register()
+def check_profile_cache(app_configs, **kwargs):
+    """Кеш профиля в памяти процесса: сброс записи не доходит до других воркеров"""
+    config = getattr(settings, 'PROFILE_CACHE', {})
+    alias = config.get('ALIAS', 'default')
+    if not config.get('ENABLED', False) or not isinstance(caches[alias], LocMemCache):
+        return []
+    return [Warning(
+        f"PROFILE_CACHE включен, но кеш '{alias}' хранится в памяти процесса: другие воркеры "
+        f"отдают старый профиль до истечения TIMEOUT",
+        hint='Укажите в PROFILE_CACHE[\'ALIAS\'] общий для воркеров кеш или выключите PROFILE_CACHE',
+        id='core.W001',
+    )]
@@ -0,0 +1,36 @@
+"""Бэкенды БД с замером времени получения соединения
+
+Подключаются через ENGINE: 'core.db.backends.postgresql' или
+'core.db.backends.sqlite3' (для локальных копий основной БД и реплик).
+"""
+import time
+
+from core.metrics import registry
+
+connect_duration = registry.histogram(
+    'db_connect_duration_seconds',
+    'Время получения соединения с БД: новое подключение или выдача из пула',
+    labelnames=('alias',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+pool_connections = registry.gauge(
+    'db_pool_connections',
+    'Соединения пула psycopg: size - открыто, available - свободно, waiting - ожидающих запросов',
+    labelnames=('alias', 'state'),
+)
+
+
+class TimedConnectMixin:
+    """Замер get_new_connection и состояния пула после выдачи соединения"""
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        connect_duration.labels(alias=self.alias).observe(time.perf_counter() - started)
+        pool = getattr(self, 'pool', None)
+        if pool is not None:
+            stats = pool.get_stats()
+            pool_connections.labels(alias=self.alias, state='size').set(stats.get('pool_size', 0))
+            pool_connections.labels(alias=self.alias, state='available').set(stats.get('pool_available', 0))
+            pool_connections.labels(alias=self.alias, state='waiting').set(stats.get('requests_waiting', 0))
+        return connection
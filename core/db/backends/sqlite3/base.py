@@ -0,0 +1,7 @@
+from django.db.backends.sqlite3 import base
+
+from core.db.backends import TimedConnectMixin
+
+
+class DatabaseWrapper(TimedConnectMixin, base.DatabaseWrapper):
+    pass
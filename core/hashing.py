@@ -0,0 +1,147 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt
+from django.conf import settings
+
+from .metrics import registry
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+hash_duration = registry.histogram(
+    'password_hash_duration_seconds',
+    'Время хеширования и проверки паролей, включая ожидание в очереди',
+    labelnames=('op',),
+)
+hash_queue_depth = registry.gauge(
+    'password_hash_queue_depth',
+    'Число задач хеширования, ожидающих свободного воркера',
+)
+hash_rejected = registry.counter(
+    'password_hash_rejected_total',
+    'Число задач хеширования, отклоненных из-за переполнения очереди',
+)
+
+
+class HashingPoolSaturated(Exception):
+    """Очередь хеширования паролей заполнена"""
+
+    def __init__(self, retry_after):
+        super().__init__('Очередь хеширования паролей заполнена')
+        self.retry_after = retry_after
+
+
+def configured_rounds():
+    """Стоимость bcrypt из настроек"""
+    return getattr(settings, 'BCRYPT_ROUNDS', 12)
+
+
+def hash_rounds(hashed_password):
+    """Стоимость, с которой создан хеш ($2b$<rounds>$...); None для чужого формата"""
+    parts = hashed_password.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def hash_password(raw_password, rounds=12):
+    return bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def is_bcrypt_hash(value):
+    return bool(value) and len(value) == 60 and value.startswith(BCRYPT_PREFIXES)
+
+
+def verify_password(raw_password, hashed_password):
+    # Неиспользуемый пароль (!...) и чужие форматы bcrypt не принимает как соль
+    if not is_bcrypt_hash(hashed_password):
+        return False
+    return bcrypt.checkpw(raw_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordHasherPool:
+    """Пул для bcrypt с ограниченной очередью
+
+    bcrypt отпускает GIL, поэтому по умолчанию используются потоки; процессы
+    включаются через PASSWORD_HASHING['EXECUTOR'] = 'process'.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._slots = None
+        self._workers = 0
+        self._inflight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return getattr(settings, 'PASSWORD_HASHING', {})
+
+    def _ensure_executor(self):
+        if self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._workers = self.config.get('WORKERS') or os.cpu_count() or 1
+            self._slots = threading.BoundedSemaphore(self._workers + self.config.get('MAX_QUEUE', 64))
+            if self.config.get('EXECUTOR', 'thread') == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix='password-hasher'
+                )
+
+    def submit(self, op, fn, *args):
+        """Постановка задачи в пул; HashingPoolSaturated, если очередь заполнена"""
+        self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            hash_rejected.inc()
+            raise HashingPoolSaturated(self.config.get('RETRY_AFTER', 1))
+
+        started = time.perf_counter()
+        self._track(1)
+
+        def done(future):
+            self._track(-1)
+            self._slots.release()
+            hash_duration.labels(op=op).observe(time.perf_counter() - started)
+
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(done)
+        return future
+
+    def _track(self, delta):
+        with self._lock:
+            self._inflight += delta
+            hash_queue_depth.set(max(0, self._inflight - self._workers))
+
+    def hash(self, raw_password, rounds=None):
+        """Хеширование с ожиданием результата (WSGI)"""
+        rounds = rounds or configured_rounds()
+        return self.submit('hash', hash_password, raw_password, rounds).result()
+
+    def verify(self, raw_password, hashed_password):
+        return self.submit('check', verify_password, raw_password, hashed_password).result()
+
+    async def ahash(self, raw_password, rounds=None):
+        """Хеширование без блокировки цикла событий (ASGI)"""
+        rounds = rounds or configured_rounds()
+        return await asyncio.wrap_future(self.submit('hash', hash_password, raw_password, rounds))
+
+    async def averify(self, raw_password, hashed_password):
+        return await asyncio.wrap_future(
+            self.submit('check', verify_password, raw_password, hashed_password)
+        )
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._executor = None
+
+
+password_hasher = PasswordHasherPool()
@@ -0,0 +1,154 @@
+import time
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import registry
+
+phase_duration = registry.histogram(
+    'request_phase_duration_seconds',
+    'Время фаз обработки запроса (auth, permission, password, view, total)',
+    labelnames=('phase',),
+)
+phase_queries = registry.histogram(
+    'request_phase_queries',
+    'Число SQL-запросов в фазе обработки запроса',
+    labelnames=('phase',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50),
+)
+
+# Замеры текущего запроса; вне запроса (команды, фоновые потоки) - None
+_current_timings = ContextVar('core_request_timings', default=None)
+
+
+def instrumentation_enabled():
+    return getattr(settings, 'INSTRUMENTATION', {}).get('ENABLED', False)
+
+
+def server_timing_enabled():
+    return getattr(settings, 'INSTRUMENTATION', {}).get('SERVER_TIMING', False)
+
+
+class RequestTimings:
+    """Длительность и число SQL-запросов по фазам одного запроса
+
+    Запросы к БД относятся к самой вложенной открытой фазе, поэтому время
+    bcrypt внутри представления учитывается и в password, и в view.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.queries = {}
+        self._open = []
+
+    def start(self, phase):
+        self._open.append((phase, time.perf_counter()))
+
+    def stop(self, phase):
+        """Закрытие фазы (и всех вложенных фаз, оставшихся открытыми)"""
+        while self._open:
+            name, started = self._open.pop()
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+            self.queries.setdefault(name, 0)
+            if name == phase:
+                break
+
+    def count_query(self):
+        phase = self._open[-1][0] if self._open else 'other'
+        self.queries[phase] = self.queries.get(phase, 0) + 1
+
+    def finish(self):
+        if self._open:
+            self.stop(self._open[0][0])
+        self.durations['total'] = time.perf_counter() - self.started
+        self.queries['total'] = sum(self.queries.values())
+
+    def observe(self):
+        for phase, duration in self.durations.items():
+            phase_duration.labels(phase=phase).observe(duration)
+            phase_queries.labels(phase=phase).observe(self.queries.get(phase, 0))
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing"""
+        return ', '.join(
+            f'{phase};dur={duration * 1000:.2f};desc="queries: {self.queries.get(phase, 0)}"'
+            for phase, duration in self.durations.items()
+        )
+
+
+def begin_request():
+    timings = RequestTimings()
+    return timings, _current_timings.set(timings)
+
+
+def end_request(token):
+    _current_timings.reset(token)
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+def instrumented(phase):
+    """Декоратор, относящий время вызова к фазе запроса
+
+    При выключенной инструментации функция возвращается без обертки.
+    """
+
+    def decorator(func):
+        if not instrumentation_enabled():
+            return func
+
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                timings = _current_timings.get()
+                if timings is None:
+                    return await func(*args, **kwargs)
+                timings.start(phase)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.stop(phase)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current_timings.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            timings.start(phase)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.stop(phase)
+
+        return wrapper
+
+    return decorator
+
+
+def _count_query(execute, sql, params, many, context):
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.count_query()
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает обертки с конца
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+def install_query_counter():
+    """Подсчет SQL-запросов во всех соединениях, включая открытые позже в других потоках"""
+    connection_created.connect(_install_query_counter, dispatch_uid='core.instrumentation.query_counter')
+    for connection in connections.all(initialized_only=True):
+        _install_query_counter(connection)
@@ -0,0 +1,151 @@
+"""Ключи подписи токенов
+
+По умолчанию токены подписываются HS256 с SECRET_KEY. Если задан
+JWT_SIGNING['ACTIVE_KID'], токены подписываются асимметричным ключом
+(Ed25519 - EdDSA, RSA - RS256, EC P-256 - ES256) из KEYS_DIR, в заголовок
+пишется kid, а открытые ключи публикуются в JWKS: другие сервисы проверяют
+токены сами, без обращения к этому приложению.
+
+Файлы в KEYS_DIR: <kid>.pem - закрытый ключ, <kid>.pub.pem - только открытый
+(выведенный из оборота ключ, которым еще проверяются выданные токены).
+"""
+import json
+import threading
+import time
+from pathlib import Path
+
+import jwt
+from django.conf import settings
+
+PRIVATE_SUFFIX = '.pem'
+PUBLIC_SUFFIX = '.pub.pem'
+# Неизвестный kid перечитывает каталог ключей не чаще раза в интервал, сек
+RELOAD_INTERVAL = 5.0
+
+
+def key_algorithm(key):
+    """Алгоритм JWT для объекта ключа cryptography"""
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'RS256'
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        return 'ES256'
+    raise ValueError(f'Неподдерживаемый тип ключа: {type(key).__name__}')
+
+
+def public_jwk(kid, public_key):
+    """Открытый ключ в формате JWK"""
+    algorithm = key_algorithm(public_key)
+    jwk = jwt.get_algorithm_by_name(algorithm).to_jwk(public_key, as_dict=True)
+    jwk.update({'kid': kid, 'alg': algorithm, 'use': 'sig'})
+    return jwk
+
+
+class SigningKey:
+    """Разобранный ключ: PEM читается один раз при загрузке кольца"""
+
+    def __init__(self, kid, public_key, private_key=None):
+        self.kid = kid
+        self.public_key = public_key
+        self.private_key = private_key
+        self.algorithm = key_algorithm(public_key)
+
+
+class KeyRing:
+    """Ключи подписи по kid: один действующий для подписи, остальные только для проверки"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._jwks = None
+        self._loaded_at = 0.0
+
+    @property
+    def config(self):
+        return getattr(settings, 'JWT_SIGNING', {})
+
+    @property
+    def active_kid(self):
+        return self.config.get('ACTIVE_KID')
+
+    def load(self):
+        """Чтение и разбор всех ключей из KEYS_DIR"""
+        keys = {}
+        keys_dir = self.config.get('KEYS_DIR')
+        if keys_dir and Path(keys_dir).is_dir():
+            from cryptography.hazmat.primitives import serialization
+
+            for path in sorted(Path(keys_dir).glob('*' + PRIVATE_SUFFIX)):
+                data = path.read_bytes()
+                if path.name.endswith(PUBLIC_SUFFIX):
+                    kid = path.name[:-len(PUBLIC_SUFFIX)]
+                    if kid not in keys:
+                        keys[kid] = SigningKey(kid, serialization.load_pem_public_key(data))
+                else:
+                    kid = path.name[:-len(PRIVATE_SUFFIX)]
+                    private_key = serialization.load_pem_private_key(data, password=None)
+                    keys[kid] = SigningKey(kid, private_key.public_key(), private_key)
+
+        if self.active_kid and (self.active_kid not in keys or keys[self.active_kid].private_key is None):
+            raise ValueError(f'Нет закрытого ключа {self.active_kid} в {keys_dir}')
+
+        jwks = json.dumps(
+            {'keys': [public_jwk(key.kid, key.public_key) for key in keys.values()]},
+            separators=(',', ':')
+        ).encode('utf-8')
+        with self._lock:
+            self._keys = keys
+            self._jwks = jwks
+            self._loaded_at = time.monotonic()
+        return keys
+
+    @property
+    def keys(self):
+        keys = self._keys
+        if keys is None:
+            keys = self.load()
+        return keys
+
+    def _key_for(self, kid):
+        key = self.keys.get(kid)
+        if key is None and time.monotonic() - self._loaded_at >= RELOAD_INTERVAL:
+            # Ключ мог появиться в каталоге после запуска процесса (ротация)
+            key = self.load().get(kid)
+        return key
+
+    def encode(self, payload):
+        """Подпись токена действующим ключом (или HS256 с SECRET_KEY)"""
+        kid = self.active_kid
+        if not kid:
+            return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+        key = self.keys[kid]
+        return jwt.encode(payload, key.private_key, algorithm=key.algorithm, headers={'kid': kid})
+
+    def decode(self, token):
+        """Проверка подписи и срока действия; исключение jwt.InvalidTokenError, если токен недействителен"""
+        kid = jwt.get_unverified_header(token).get('kid')
+        if kid is None:
+            # Токены без kid подписаны SECRET_KEY (в том числе выданные до перехода на ключи)
+            return jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+        key = self._key_for(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f'Неизвестный ключ {kid}')
+        # Алгоритм берется из ключа, а не из заголовка токена
+        return jwt.decode(token, key.public_key, algorithms=[key.algorithm])
+
+    def jwks(self):
+        """Открытые ключи в формате JWKS (готовый JSON)"""
+        if self._jwks is None:
+            self.load()
+        return self._jwks
+
+    def clear(self):
+        with self._lock:
+            self._keys = None
+            self._jwks = None
+
+
+key_ring = KeyRing()
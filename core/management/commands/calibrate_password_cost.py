@@ -0,0 +1,58 @@
+import math
+import time
+
+import bcrypt
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = max(0, math.ceil(q * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Подбор стоимости bcrypt под целевую задержку p99 на этой машине'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250.0,
+                            help='Допустимое время хеширования (p99), мс')
+        parser.add_argument('--samples', type=int, default=20,
+                            help='Число замеров на каждую стоимость')
+        parser.add_argument('--min-rounds', type=int, default=10)
+        parser.add_argument('--max-rounds', type=int, default=16)
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        password = b'calibration-password'
+        chosen = None
+
+        self.stdout.write(f"{'rounds':>6} {'p50, мс':>10} {'p99, мс':>10}")
+        for rounds in range(options['min_rounds'], options['max_rounds'] + 1):
+            salt = bcrypt.gensalt(rounds)
+            timings = []
+            for _ in range(options['samples']):
+                started = time.perf_counter()
+                bcrypt.hashpw(password, salt)
+                timings.append(time.perf_counter() - started)
+
+            p99 = percentile(timings, 0.99)
+            self.stdout.write(f'{rounds:>6} {percentile(timings, 0.5) * 1000:>10.1f} {p99 * 1000:>10.1f}')
+            if p99 > target:
+                # Каждая следующая стоимость вдвое дороже: дальше замерять нет смысла
+                break
+            chosen = rounds
+
+        if chosen is None:
+            self.stdout.write(self.style.WARNING(
+                f"Даже {options['min_rounds']} раундов не укладываются в {options['target_ms']} мс"
+            ))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Рекомендуемое значение: BCRYPT_ROUNDS={chosen}'))
+        if chosen != settings.BCRYPT_ROUNDS:
+            self.stdout.write(
+                f'Сейчас используется {settings.BCRYPT_ROUNDS}; хеши пользователей будут '
+                f'пересозданы при их следующем входе'
+            )
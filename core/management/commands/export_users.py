@@ -0,0 +1,58 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import CustomUser
+from core.userio import RecordWriter, detect_format, open_output
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка пользователей в JSONL или CSV (с хешами паролей)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для записи или "-" для stdout')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='Формат (по умолчанию по расширению файла)')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Строк, читаемых из БД за раз')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        # При выводе в stdout отчет пишем в stderr, чтобы не смешивать с данными
+        report = self.stderr if path == '-' else self.stdout
+
+        users = (
+            CustomUser.objects.order_by('id')
+            .values_list(
+                'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'role__name', 'password'
+            )
+        )
+
+        started = time.perf_counter()
+        count = 0
+        stream = open_output(path)
+        try:
+            writer = RecordWriter(stream, fmt)
+            for email, first_name, last_name, is_active, is_staff, is_superuser, role, password in users.iterator(
+                chunk_size=options['chunk_size']
+            ):
+                writer.write({
+                    'email': email,
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'is_active': is_active,
+                    'is_staff': is_staff,
+                    'is_superuser': is_superuser,
+                    'role': role or '',
+                    'password_hash': password,
+                })
+                count += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else 0
+        report.write(f'Выгружено {count} пользователей за {elapsed:.1f} с ({rate:.0f} строк/с)')
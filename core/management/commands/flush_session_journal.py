@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.session_recorder import recover_journal, session_recorder
+
+
+class Command(BaseCommand):
+    help = 'Запись в БД сессий из журналов отложенной записи, оставшихся от завершившихся процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--journal-dir', help="Каталог журналов (по умолчанию SESSION_WRITE_BEHIND['JOURNAL_DIR'])")
+
+    def handle(self, *args, **options):
+        journal_dir = options['journal_dir'] or session_recorder.journal_dir
+        written = recover_journal(journal_dir)
+        self.stdout.write(self.style.SUCCESS(f'Записано {written} сессий из {journal_dir}'))
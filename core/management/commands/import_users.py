@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import transaction
+
+from core.hashing import configured_rounds, hash_password, is_bcrypt_hash
+from core.models import CustomUser, Role
+from core.userio import detect_format, open_input, parse_bool, read_records
+
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, position):
+    # Через временный файл, чтобы при падении не остался обрезанный checkpoint
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(position))
+    os.replace(tmp_path, path)
+
+
+class Command(BaseCommand):
+    help = 'Потоковая загрузка пользователей из JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с пользователями или "-" для stdin')
+        parser.add_argument('--format', choices=('jsonl', 'csv'),
+                            help='Формат (по умолчанию по расширению файла)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Пользователей в одном bulk_create')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для хеширования паролей в открытом виде')
+        parser.add_argument('--rounds', type=int,
+                            help='Стоимость bcrypt (по умолчанию BCRYPT_ROUNDS)')
+        parser.add_argument('--checkpoint',
+                            help='Файл с номером последней записанной записи для продолжения')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = detect_format(path, options['format'])
+        batch_size = options['batch_size']
+        checkpoint = options['checkpoint']
+        if checkpoint and path == '-':
+            raise CommandError('Продолжение по checkpoint невозможно при чтении из stdin')
+
+        self.hash = partial(hash_password, rounds=options['rounds'] or configured_rounds())
+        self.workers = options['workers']
+        self.roles = dict(Role.objects.values_list('name', 'id'))
+
+        position = read_checkpoint(checkpoint) if checkpoint else 0
+        if position:
+            self.stdout.write(f'Продолжение с записи {position + 1}')
+
+        stream = open_input(path)
+        started = time.perf_counter()
+        created = 0
+        skipped = 0
+        try:
+            records = islice(read_records(stream, fmt), position, None)
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                while True:
+                    batch = list(islice(records, batch_size))
+                    if not batch:
+                        break
+
+                    users = self.build_users(batch, pool)
+                    skipped += len(batch) - len(users)
+                    with transaction.atomic():
+                        # Повторная загрузка после сбоя не дублирует пользователей
+                        CustomUser.objects.bulk_create(users, batch_size=batch_size, ignore_conflicts=True)
+                    created += len(users)
+                    position += len(batch)
+                    if checkpoint:
+                        write_checkpoint(checkpoint, position)
+
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f'Обработано {position} записей, {created / elapsed:.0f} пользователей/с')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        rate = created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {created} пользователей за {elapsed:.1f} с ({rate:.0f}/с), пропущено {skipped}'
+        ))
+
+    def build_users(self, batch, pool):
+        """Новые объекты CustomUser для порции записей; пароли в открытом виде хешируются в пуле
+
+        Записи без email, с хешем не в формате bcrypt и с email, который уже есть
+        в БД или встретился раньше в порции, пропускаются.
+        """
+        emails = {}
+        for record in batch:
+            email = (record.get('email') or '').strip()
+            if email:
+                emails.setdefault(CustomUser.objects.normalize_email(email), record)
+        existing = set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+
+        users = []
+        plaintext = []
+        for email, record in emails.items():
+            if email in existing:
+                continue
+            password_hash = record.get('password_hash') or ''
+            if password_hash and not (
+                is_bcrypt_hash(password_hash) or password_hash.startswith(UNUSABLE_PASSWORD_PREFIX)
+            ):
+                continue
+            password = record.get('password') or ''
+            user = CustomUser(
+                email=email,
+                first_name=record.get('first_name') or '',
+                last_name=record.get('last_name') or '',
+                is_active=parse_bool(record.get('is_active'), default=True),
+                is_staff=parse_bool(record.get('is_staff')),
+                is_superuser=parse_bool(record.get('is_superuser')),
+                role_id=self.role_id(record.get('role')),
+            )
+            if password_hash:
+                # Готовый хеш bcrypt (или выгруженный неиспользуемый пароль) сохраняем как есть
+                user.password = password_hash
+            elif password:
+                plaintext.append((user, password))
+            else:
+                user.set_unusable_password()
+            users.append(user)
+
+        if plaintext:
+            chunksize = max(1, len(plaintext) // (self.workers * 4))
+            hashes = pool.map(self.hash, [password for _, password in plaintext], chunksize=chunksize)
+            for (user, _), hashed in zip(plaintext, hashes):
+                user.password = hashed
+        return users
+
+    def role_id(self, name):
+        if not name:
+            return None
+        if name not in self.roles:
+            self.roles[name] = Role.objects.get_or_create(name=name)[0].id
+        return self.roles[name]
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    help = 'Секционирование таблицы сессий по expires_at (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int,
+                            help='Сколько будущих месячных секций создать заранее')
+
+    def handle(self, *args, **options):
+        if not partitioning.supports_partitioning(connection):
+            raise CommandError('Секционирование поддерживается только в PostgreSQL')
+
+        months_ahead = options['months_ahead']
+        if months_ahead is None:
+            months_ahead = getattr(settings, 'SESSION_PARTITIONING', {}).get('MONTHS_AHEAD', 3)
+
+        if partitioning.is_partitioned(connection):
+            created = partitioning.ensure_partitions(connection, timezone.now(), months_ahead)
+            self.stdout.write(f'Таблица уже секционирована, секций до {created[-1]}')
+            return
+
+        with transaction.atomic():
+            partitioning.convert_to_partitioned(connection, months_ahead)
+        self.stdout.write(self.style.SUCCESS('Таблица сессий секционирована по expires_at'))
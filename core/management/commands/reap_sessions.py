@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core.reaper import SessionReaper
+
+
+class Command(BaseCommand):
+    help = 'Удаление истекших и неактивных сессий порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Строк в одной порции')
+        parser.add_argument('--pause', type=float, help='Пауза между порциями, сек')
+        parser.add_argument('--max-lag', type=float,
+                            help='Допустимое отставание реплик, сек (0 - не проверять)')
+        parser.add_argument('--max-batches', type=int, help='Остановиться после N порций')
+
+    def handle(self, *args, **options):
+        reaper = SessionReaper(
+            batch_size=options['batch_size'],
+            batch_pause=options['pause'],
+            max_replication_lag=options['max_lag'],
+        )
+        deleted, elapsed = reaper.run(
+            max_batches=options['max_batches'],
+            report=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        rate = deleted / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено {deleted} сессий за {elapsed:.2f} с ({rate:.0f} строк/с)'
+        ))
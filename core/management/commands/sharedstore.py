@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.sharedstore import SharedStoreServer
+
+
+class Command(BaseCommand):
+    help = 'Запуск сервера общего хранилища (отозванные токены, попытки входа) для нескольких воркеров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=7379)
+
+    def handle(self, *args, **options):
+        server = SharedStoreServer((options['host'], options['port']))
+        self.stdout.write(f"Общее хранилище слушает {options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.keys import PRIVATE_SUFFIX, PUBLIC_SUFFIX, key_ring
+
+
+def generate_private_key(algorithm):
+    from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+class Command(BaseCommand):
+    help = 'Создание и вывод из оборота ключей подписи токенов (JWT_SIGNING[\'KEYS_DIR\'])'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        generate = subparsers.add_parser('generate', help='Новый закрытый ключ')
+        generate.add_argument('--algorithm', choices=('EdDSA', 'RS256', 'ES256'), default='EdDSA')
+        generate.add_argument('--kid', help='Идентификатор ключа (по умолчанию дата и время)')
+        retire = subparsers.add_parser('retire', help='Оставить от ключа только открытую часть')
+        retire.add_argument('kid')
+        subparsers.add_parser('list', help='Ключи в каталоге')
+
+    def handle(self, *args, **options):
+        keys_dir = settings.JWT_SIGNING.get('KEYS_DIR')
+        if not keys_dir:
+            raise CommandError("Не задан JWT_SIGNING['KEYS_DIR']")
+        keys_dir = Path(keys_dir)
+        handlers = {'generate': self.generate, 'retire': self.retire, 'list': self.list_keys}
+        handlers[options['action']](keys_dir, options)
+
+    def generate(self, keys_dir, options):
+        from cryptography.hazmat.primitives import serialization
+
+        kid = options['kid'] or timezone.now().strftime('%Y%m%d%H%M%S')
+        path = keys_dir / f'{kid}{PRIVATE_SUFFIX}'
+        if path.exists():
+            raise CommandError(f'Ключ {kid} уже существует')
+
+        private_key = generate_private_key(options['algorithm'])
+        keys_dir.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+        path.chmod(0o600)
+        self.stdout.write(self.style.SUCCESS(f'Создан ключ {kid} ({options["algorithm"]}): {path}'))
+        self.stdout.write(
+            'Дождитесь, пока ключ загрузят все воркеры (он сразу попадает в JWKS), '
+            f'затем задайте JWT_ACTIVE_KID={kid}'
+        )
+
+    def retire(self, keys_dir, options):
+        from cryptography.hazmat.primitives import serialization
+
+        kid = options['kid']
+        if kid == settings.JWT_SIGNING.get('ACTIVE_KID'):
+            raise CommandError(f'Ключ {kid} сейчас используется для подписи')
+        path = keys_dir / f'{kid}{PRIVATE_SUFFIX}'
+        if not path.exists():
+            raise CommandError(f'Нет закрытого ключа {kid}')
+
+        private_key = serialization.load_pem_private_key(path.read_bytes(), password=None)
+        (keys_dir / f'{kid}{PUBLIC_SUFFIX}').write_bytes(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        ))
+        path.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ключ {kid} выведен из оборота: токены им проверяются, но не подписываются. '
+            f'Удалите {kid}{PUBLIC_SUFFIX}, когда истекут выданные им refresh-токены'
+        ))
+
+    def list_keys(self, keys_dir, options):
+        active = settings.JWT_SIGNING.get('ACTIVE_KID')
+        for kid, key in key_ring.load().items():
+            state = 'подпись' if kid == active else ('закрытый' if key.private_key else 'только проверка')
+            self.stdout.write(f'{kid:<20} {key.algorithm:<6} {state}')
@@ -1,31 +1,189 @@
+from django.core.exceptions import MiddlewareNotUsed
 from django.http import JsonResponse
 from django.utils.deprecation import MiddlewareMixin
-from .utils import get_user_from_token
+from .instrumentation import (
+    begin_request, current_timings, end_request, install_query_counter,
+    instrumentation_enabled, server_timing_enabled
+)
+from .policies import route_policies
+from .routers import (
+    allow_replica_reads, apin_user, auser_pinned, fresh_token, pin_user, replicas,
+    reset_replica_reads, token_claims, user_pinned
+)
+from .utils import (
+    acheck_permission, aget_user_from_token, check_permission, get_token_from_request, get_user_from_token
+)
 
 class AuthenticationMiddleware(MiddlewareMixin):
-    """Middleware для аутентификации пользователя по JWT токену"""
+    """Middleware для аутентификации и авторизации по JWT токену
 
-    # Пути, которые не требуют аутентификации
-    PUBLIC_PATHS = [
-        '/api/login/',
-        '/api/register/',
+    Политика маршрута (публичный, только staff, бизнес-элемент и действие)
+    объявляется декоратором route_policy на представлении и определяется одним
+    сопоставлением пути. Работает и в WSGI, и в ASGI: под ASGI проверка
+    выполняется в цикле событий (__acall__), без перехода в поток.
+    """
+
+    # Префиксы без представлений с политиками, которые не требуют аутентификации
+    PUBLIC_PREFIXES = [
         '/api/docs/',
         '/admin/',
     ]
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        route_policies.compile(self.PUBLIC_PREFIXES)
+
+    def unauthorized(self):
+        # Для всех остальных запросов требуется аутентификация
+        return JsonResponse(
+            {'error': 'Требуется аутентификация'},
+            status=401
+        )
+
+    def forbidden(self):
+        return JsonResponse(
+            {'error': 'Доступ запрещен'},
+            status=403
+        )
+
     def process_request(self, request):
+        policy = route_policies.resolve(request.path_info)
         # Пропускаем аутентификацию для публичных путей
-        if any(request.path.startswith(path) for path in self.PUBLIC_PATHS):
+        if policy.public:
             return None
 
         user = get_user_from_token(request)
+        if not user:
+            return self.unauthorized()
+        request.user = user
 
-        if user:
+        if policy.staff and not user.is_staff:
+            return self.forbidden()
+
+        action = policy.action_for(request.method)
+        if policy.element and action and not check_permission(user, policy.element, action):
+            return self.forbidden()
+        return None
+
+    async def __acall__(self, request):
+        policy = route_policies.resolve(request.path_info)
+        if not policy.public:
+            user = await aget_user_from_token(request)
+            if not user:
+                return self.unauthorized()
             request.user = user
+
+            if policy.staff and not user.is_staff:
+                return self.forbidden()
+
+            action = policy.action_for(request.method)
+            if policy.element and action and not await acheck_permission(user, policy.element, action):
+                return self.forbidden()
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware(MiddlewareMixin):
+    """Замеры фаз запроса: аутентификация, права, bcrypt и представление
+
+    Ставится первым в MIDDLEWARE. При выключенной инструментации
+    (INSTRUMENTATION['ENABLED']) исключается из цепочки middleware.
+    """
+
+    def __init__(self, get_response):
+        if not instrumentation_enabled():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.server_timing = server_timing_enabled()
+        install_query_counter()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Фаза view длится от вызова представления до возврата ответа в этот middleware
+        timings = current_timings()
+        if timings is not None:
+            timings.start('view')
+        return None
+
+    def finish(self, timings, response):
+        timings.finish()
+        timings.observe()
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing()
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(timings, response)
+
+    async def __acall__(self, request):
+        timings, token = begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(timings, response)
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """Разрешение чтений с реплик в безопасных запросах с сохранением read-your-writes
+
+    Изменяющие запросы, запросы со свежим токеном и запросы пользователя,
+    недавно изменившего данные, читают с основной БД. Без реплик
+    (DATABASE_REPLICATION['REPLICAS']) исключается из цепочки middleware.
+    """
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not replicas():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def claims(self, request):
+        token = get_token_from_request(request)
+        return token_claims(token) if token else (None, None)
+
+    def written_user(self, request, response, user_id):
+        """Пользователь успешного изменяющего запроса"""
+        if request.method in self.SAFE_METHODS or response.status_code >= 400:
             return None
-        else:
-            # Для всех остальных запросов требуется аутентификация
-            return JsonResponse(
-                {'error': 'Требуется аутентификация'},
-                status=401
-            )
\ No newline at end of file
+        return getattr(getattr(request, 'user', None), 'pk', None) or user_id
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        user_id, iat = self.claims(request)
+        allowed = (
+            request.method in self.SAFE_METHODS and not fresh_token(iat)
+            and not (user_id is not None and user_pinned(user_id))
+        )
+        token = allow_replica_reads(allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        written = self.written_user(request, response, user_id)
+        if written is not None:
+            pin_user(written)
+        return response
+
+    async def __acall__(self, request):
+        user_id, iat = self.claims(request)
+        allowed = (
+            request.method in self.SAFE_METHODS and not fresh_token(iat)
+            and not (user_id is not None and await auser_pinned(user_id))
+        )
+        token = allow_replica_reads(allowed)
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        written = self.written_user(request, response, user_id)
+        if written is not None:
+            await apin_user(written)
+        return response
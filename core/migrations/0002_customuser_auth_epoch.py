@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='auth_epoch',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,50 @@
+import hashlib
+import uuid
+
+import jwt
+from django.db import migrations, models
+
+BATCH_SIZE = 10000
+
+
+def session_key(token):
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except jwt.DecodeError:
+        payload = {}
+    jti = payload.get('jti')
+    if jti:
+        return uuid.UUID(jti)
+    return uuid.UUID(bytes=hashlib.sha256(token.encode('utf-8')).digest()[:16])
+
+
+def backfill_jti(apps, schema_editor):
+    UserSession = apps.get_model('core', 'UserSession')
+    db_alias = schema_editor.connection.alias
+    sessions = UserSession.objects.using(db_alias).filter(jti__isnull=True).only('id', 'token')
+
+    batch = []
+    for session in sessions.iterator(chunk_size=BATCH_SIZE):
+        session.jti = session_key(session.token)
+        batch.append(session)
+        if len(batch) >= BATCH_SIZE:
+            UserSession.objects.using(db_alias).bulk_update(batch, ['jti'])
+            batch = []
+    if batch:
+        UserSession.objects.using(db_alias).bulk_update(batch, ['jti'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_customuser_auth_epoch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='jti',
+            field=models.UUIDField(null=True),
+        ),
+        migrations.RunPython(backfill_jti, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_usersession_jti'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='usersession',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='usersession',
+            name='jti',
+            field=models.UUIDField(unique=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_remove_usersession_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(fields=['expires_at'], name='core_session_expires_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usersession',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['id'], name='core_session_inactive_idx'),
+        ),
+    ]
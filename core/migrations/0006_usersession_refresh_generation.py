@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_usersession_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='refresh_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.permissions import RULE_FIELDS, pack_flags
+
+
+def build_snapshots(apps, schema_editor):
+    Role = apps.get_model('core', 'Role')
+    AccessRoleRule = apps.get_model('core', 'AccessRoleRule')
+    RolePermissions = apps.get_model('core', 'RolePermissions')
+    db_alias = schema_editor.connection.alias
+
+    masks = {role_id: {} for role_id in Role.objects.using(db_alias).values_list('id', flat=True)}
+    rows = AccessRoleRule.objects.using(db_alias).values_list('role_id', 'business_element__name', *RULE_FIELDS)
+    for row in rows:
+        mask = pack_flags(row[2:])
+        if mask:
+            masks[row[0]][row[1]] = mask
+    RolePermissions.objects.using(db_alias).bulk_create(
+        [RolePermissions(role_id=role_id, masks=role_masks) for role_id, role_masks in masks.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_usersession_refresh_generation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RolePermissions',
+            fields=[
+                ('role', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='permissions', serialize=False, to='core.role')),
+                ('masks', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_snapshots, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-import bcrypt
-import jwt
-from datetime import datetime, timedelta
+import uuid
+from datetime import timedelta
 from django.conf import settings
+from django.utils import timezone
+from .hashing import configured_rounds, hash_rounds, password_hasher
+from .instrumentation import instrumented
+from .keys import key_ring
 
 
 class CustomUserManager(BaseUserManager):
@@ -45,30 +48,87 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     role = models.ForeignKey('Role', on_delete=models.SET_NULL, null=True, blank=True)
+    # Увеличивается при изменении полей, зашитых в токен: старые токены перестают приниматься
+    auth_epoch = models.PositiveIntegerField(default=0)
+
+    # Поля, от которых зависят claims токена
+    AUTH_STATE_FIELDS = ('is_active', 'is_staff', 'is_superuser', 'role_id')
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
     objects = CustomUserManager()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._auth_state = instance._get_auth_state()
+        return instance
+
+    def _get_auth_state(self):
+        # Берем значения из __dict__, чтобы не догружать отложенные поля
+        return tuple(self.__dict__.get(field) for field in self.AUTH_STATE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        state = self._get_auth_state()
+        loaded_state = getattr(self, '_auth_state', state)
+        if loaded_state != state:
+            self.auth_epoch += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'auth_epoch'}
+        super().save(*args, **kwargs)
+        self._auth_state = state
+
+    @instrumented('password')
     def set_password(self, raw_password):
         """Хеширование пароля с помощью bcrypt"""
-        salt = bcrypt.gensalt()
-        self.password = bcrypt.hashpw(raw_password.encode('utf-8'), salt).decode('utf-8')
+        self.password = password_hasher.hash(raw_password)
 
+    @instrumented('password')
     def check_password(self, raw_password):
         """Проверка пароля"""
-        return bcrypt.checkpw(raw_password.encode('utf-8'), self.password.encode('utf-8'))
-
-    def generate_jwt_token(self):
-        """Генерация JWT токена"""
+        return password_hasher.verify(raw_password, self.password)
+
+    def password_needs_rehash(self):
+        """Хеш создан с другой стоимостью, чем указана в настройках"""
+        return hash_rounds(self.password) != configured_rounds()
+
+    @instrumented('password')
+    async def aset_password(self, raw_password):
+        """Хеширование пароля без блокировки цикла событий"""
+        self.password = await password_hasher.ahash(raw_password)
+
+    @instrumented('password')
+    async def acheck_password(self, raw_password):
+        """Проверка пароля без блокировки цикла событий"""
+        return await password_hasher.averify(raw_password, self.password)
+
+    def generate_jwt_token(self, session_id=None):
+        """Генерация короткоживущего access-токена"""
+        # Время с часовым поясом: PyJWT считает наивные datetime временем UTC
+        now = timezone.now()
         payload = {
             'user_id': self.id, # type: ignore
             'email': self.email,
-            'exp': datetime.now() + timedelta(days=1),
-            'iat': datetime.now()
+            'exp': now + timedelta(seconds=settings.JWT_ACCESS_TOKEN_LIFETIME),
+            'iat': now,
+            # Короткий идентификатор токена для отзыва
+            'jti': uuid.uuid4().hex,
+            'type': 'access',
         }
-        return jwt.encode(payload, settings.SECRET_KEY, algorithm='HS256')
+        if session_id is not None:
+            # Сессия (цепочка refresh-токенов), в которой выдан токен
+            payload['sid'] = session_id.hex
+        if settings.JWT_EMBED_CLAIMS:
+            # Данные для аутентификации без запроса к БД
+            payload.update({
+                'role_id': self.role_id, # type: ignore
+                'is_staff': self.is_staff,
+                'is_superuser': self.is_superuser,
+                'epoch': self.auth_epoch,
+            })
+        return key_ring.encode(payload)
 
     def __str__(self):
         return self.email
@@ -111,16 +171,58 @@ class AccessRoleRule(models.Model):
         return f'{self.role} access to {self.business_element}'
 
 
+class RolePermissions(models.Model):
+    """Действующие права роли: битовая маска действий по каждому бизнес-элементу
+
+    Пересобирается из AccessRoleRule при каждом изменении правил роли
+    (core.signals), чтобы права читались одним запросом по ключу.
+    """
+    role = models.OneToOneField(Role, on_delete=models.CASCADE, primary_key=True, related_name='permissions')
+    # {имя элемента: маска}; бит i соответствует core.permissions.ACTIONS[i]
+    masks = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.role} permissions'
+
+
 class UserSession(models.Model):
-    """Модель для хранения сессий пользователей"""
+    """Модель для хранения сессий пользователей
+
+    Сессия создается при входе и живет, пока действуют ее refresh-токены.
+    """
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    token = models.CharField(max_length=500, unique=True)
+    # Идентификатор сессии (sid в токенах, 16 байт); для старых токенов без sid - jti или
+    # первые 16 байт SHA-256 токена
+    jti = models.UUIDField(unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     is_active = models.BooleanField(default=True)
+    # Номер действующего refresh-токена; предъявление предыдущего означает его кражу
+    refresh_generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Поиск истекших сессий при очистке
+            models.Index(fields=['expires_at'], name='core_session_expires_idx'),
+            # Неактивные сессии (выход из системы) без полного сканирования
+            models.Index(fields=['id'], name='core_session_inactive_idx', condition=models.Q(is_active=False)),
+        ]
 
     def is_expired(self):
-        return datetime.now() > self.expires_at
+        return timezone.now() > self.expires_at
+
+    def generate_refresh_token(self):
+        """Refresh-токен текущего поколения; действует до конца сессии"""
+        payload = {
+            'user_id': self.user_id, # type: ignore
+            'sid': self.jti.hex,
+            'gen': self.refresh_generation,
+            'exp': self.expires_at,
+            'iat': timezone.now(),
+            'type': 'refresh',
+        }
+        return key_ring.encode(payload)
 
     def __str__(self):
         return f'{self.user.email} - {self.created_at}'
\ No newline at end of file
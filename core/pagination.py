@@ -0,0 +1,44 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .permissions import permission_matrix
+
+
+class KeysetPagination(CursorPagination):
+    """Постраничная выдача по первичному ключу: WHERE id > курсор ORDER BY id LIMIT n
+
+    Стоимость страницы не зависит от ее номера, в отличие от OFFSET.
+    Параметры: ?limit= (по умолчанию 100, не больше 500) и ?cursor= из поля next.
+    """
+
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'limit'
+    max_page_size = 500
+
+
+def permissions_etag(request):
+    """ETag списка ролей и правил по версии матрицы прав (без запросов к БД)
+
+    Версия увеличивается после каждого изменения ролей, элементов и правил;
+    параметры запроса (страница, поля) входят в ETag.
+    """
+    query = hashlib.blake2b(request.get_full_path().encode('utf-8'), digest_size=8).hexdigest()
+    return quote_etag(f'{permission_matrix.shared_version()}-{query}')
+
+
+def not_modified(request, etag):
+    """Ответ 304, если клиент уже получил данные с этим ETag"""
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return with_etag(Response(status=304), etag)
+    return None
+
+
+def with_etag(response, etag):
+    response['ETag'] = etag
+    # Данные доступны только администраторам: хранить только у клиента и каждый раз сверять ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
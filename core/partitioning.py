@@ -0,0 +1,145 @@
+"""Секционирование core_usersession по expires_at (только PostgreSQL)
+
+Таблица делится на месячные секции. Секцию, все сессии которой истекли,
+очистка удаляет целиком (DROP TABLE) вместо построчного DELETE.
+"""
+from datetime import datetime, timezone
+
+TABLE = 'core_usersession'
+LEGACY_TABLE = 'core_usersession_unpartitioned'
+SEQUENCE = 'core_usersession_partitioned_id_seq'
+PARTITION_PREFIX = f'{TABLE}_p'
+
+
+def supports_partitioning(connection):
+    return connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection):
+    if not supports_partitioning(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE relname = %s', [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(value):
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def _partition_name(month):
+    return f'{PARTITION_PREFIX}{month:%Y%m}'
+
+
+def ensure_partitions(connection, start, months_ahead):
+    """Создание месячных секций от start до текущего месяца + months_ahead"""
+    month = _month_start(start)
+    last = _month_start(datetime.now(timezone.utc))
+    for _ in range(months_ahead):
+        last = _next_month(last)
+
+    created = []
+    with connection.cursor() as cursor:
+        while month <= last:
+            upper = _next_month(month)
+            name = _partition_name(month)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, upper],
+            )
+            created.append(name)
+            month = upper
+    return created
+
+
+def drop_expired_partitions(connection, now):
+    """Удаление секций, в которых все сессии уже истекли"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class parent ON parent.oid = pg_inherits.inhparent '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE parent.relname = %s AND child.relname LIKE %s',
+            [TABLE, f'{PARTITION_PREFIX}%'],
+        )
+        names = sorted(row[0] for row in cursor.fetchall())
+
+        dropped = []
+        current = _partition_name(_month_start(now))
+        for name in names:
+            suffix = name[len(PARTITION_PREFIX):]
+            # Секция за месяц, предшествующий текущему, целиком в прошлом
+            if suffix.isdigit() and name < current:
+                cursor.execute(f'DROP TABLE {name}')
+                dropped.append(name)
+    return dropped
+
+
+def _column_definitions(connection):
+    """Определения столбцов секционированной таблицы по полям UserSession"""
+    from .models import UserSession
+
+    quote = connection.ops.quote_name
+    columns = []
+    for field in UserSession._meta.concrete_fields:
+        definition = f'{quote(field.column)} {field.db_type(connection)}'
+        if not field.null:
+            definition += ' NOT NULL'
+        if field.primary_key:
+            definition += f" DEFAULT nextval('{SEQUENCE}')"
+        check = field.db_check(connection)
+        if check:
+            definition += f' CHECK ({check})'
+        if field.remote_field is not None:
+            target = field.target_field
+            definition += (
+                f' REFERENCES {quote(target.model._meta.db_table)} ({quote(target.column)})'
+                f' DEFERRABLE INITIALLY DEFERRED'
+            )
+        columns.append((field.column, definition))
+    return columns
+
+
+def convert_to_partitioned(connection, months_ahead=3):
+    """Перестройка core_usersession в секционированную таблицу с переносом данных
+
+    Первичный ключ и уникальность jti в секционированной таблице обязаны
+    включать ключ секционирования, поэтому они становятся (id, expires_at) и
+    (jti, expires_at). Столбцы берутся из полей модели, поэтому новые поля
+    UserSession переносятся без правки этой функции.
+    """
+    columns = _column_definitions(connection)
+    definitions = ', '.join(definition for _, definition in columns)
+    names = ', '.join(connection.ops.quote_name(column) for column, _ in columns)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}')
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}')
+        cursor.execute(f"SELECT setval('{SEQUENCE}', COALESCE(MAX(id), 0) + 1, false) FROM {LEGACY_TABLE}")
+        cursor.execute(
+            f'CREATE TABLE {TABLE} ({definitions}, '
+            f'PRIMARY KEY (id, expires_at), UNIQUE (jti, expires_at)) '
+            f'PARTITION BY RANGE (expires_at)'
+        )
+        cursor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+        cursor.execute(f'CREATE INDEX core_usersession_user_id_idx ON {TABLE} (user_id)')
+        cursor.execute(f'CREATE INDEX core_session_expires_idx_p ON {TABLE} (expires_at)')
+        cursor.execute(f'CREATE INDEX core_session_inactive_idx_p ON {TABLE} (id) WHERE NOT is_active')
+        # Сессии вне созданных секций не теряются
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'SELECT MIN(expires_at) FROM {LEGACY_TABLE}')
+        oldest = cursor.fetchone()[0] or datetime.now(timezone.utc)
+
+    ensure_partitions(connection, oldest, months_ahead)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {TABLE} ({names}) SELECT {names} FROM {LEGACY_TABLE}')
+        cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
@@ -0,0 +1,209 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Порядок действий задает номер бита в маске и не должен меняться
+ACTIONS = ('read', 'create', 'update', 'delete', 'read_all', 'update_all', 'delete_all')
+ACTION_BITS = {action: 1 << index for index, action in enumerate(ACTIONS)}
+ALL_ACTIONS_MASK = (1 << len(ACTIONS)) - 1
+RULE_FIELDS = tuple(f'can_{action}' for action in ACTIONS)
+
+VERSION_CACHE_KEY = 'core:permission_matrix:version'
+
+
+def pack_flags(flags):
+    """Упаковка значений can_* (в порядке ACTIONS) в битовую маску"""
+    mask = 0
+    for index, value in enumerate(flags):
+        if value:
+            mask |= 1 << index
+    return mask
+
+
+def unpack_mask(mask):
+    """Распаковка битовой маски в словарь {действие: bool}"""
+    return {action: bool(mask & bit) for action, bit in ACTION_BITS.items()}
+
+
+def build_role_masks(role_ids=None):
+    """Маски ролей из AccessRoleRule одним запросом: {role_id: {элемент: маска}}"""
+    from .models import AccessRoleRule
+
+    rows = AccessRoleRule.objects.values_list('role_id', 'business_element__name', *RULE_FIELDS)
+    if role_ids is not None:
+        rows = rows.filter(role_id__in=role_ids)
+    masks = {}
+    for row in rows:
+        mask = pack_flags(row[2:])
+        if mask:
+            masks.setdefault(row[0], {})[row[1]] = mask
+    return masks
+
+
+def rebuild_role_permissions(role_ids=None):
+    """Пересборка снимков RolePermissions для перечисленных ролей (по умолчанию всех)"""
+    from .models import Role, RolePermissions
+
+    roles = Role.objects.values_list('id', flat=True)
+    if role_ids is not None:
+        # Роль могла быть удалена в той же транзакции
+        roles = roles.filter(id__in=role_ids)
+    role_ids = list(roles)
+    masks = build_role_masks(role_ids)
+    RolePermissions.objects.bulk_create(
+        [RolePermissions(role_id=role_id, masks=masks.get(role_id, {})) for role_id in role_ids],
+        update_conflicts=True,
+        unique_fields=['role'],
+        update_fields=['masks', 'updated_at'],
+    )
+
+
+def upsert_access_rules(entries):
+    """Создание и обновление правил одной транзакцией: [(role_id, element_id, {флаг: bool})]
+
+    Сигналы post_save при bulk_create не отправляются, поэтому снимки ролей
+    пересобираются и версия матрицы увеличивается один раз после коммита.
+    Возвращает (создано, обновлено).
+    """
+    from django.db import transaction
+
+    from .models import AccessRoleRule
+
+    role_ids = {role_id for role_id, _, _ in entries}
+    with transaction.atomic():
+        # Текущие значения нужны для флагов, не переданных в запросе
+        existing = {
+            (rule.role_id, rule.business_element_id): rule
+            for rule in AccessRoleRule.objects.select_for_update().filter(
+                role_id__in=role_ids,
+                business_element_id__in={element_id for _, element_id, _ in entries},
+            )
+        }
+        rules = []
+        for role_id, element_id, flags in entries:
+            current = existing.get((role_id, element_id))
+            values = {field: getattr(current, field) if current else False for field in RULE_FIELDS}
+            values.update(flags)
+            rules.append(AccessRoleRule(role_id=role_id, business_element_id=element_id, **values))
+        AccessRoleRule.objects.bulk_create(
+            rules,
+            update_conflicts=True,
+            unique_fields=['role', 'business_element'],
+            update_fields=list(RULE_FIELDS),
+        )
+        transaction.on_commit(lambda: rebuild_role_permissions(role_ids))
+        transaction.on_commit(permission_matrix.invalidate)
+
+    updated = sum(1 for role_id, element_id, _ in entries if (role_id, element_id) in existing)
+    return len(entries) - updated, updated
+
+
+class PermissionMatrix:
+    """Скомпилированная матрица прав: (role_id, element_name) -> битовая маска"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._by_role = {}
+        self._elements = ()
+        self._checked_at = 0.0
+        # Версия, с которой была собрана локальная копия матрицы
+        self.version = None
+
+    @property
+    def _cache(self):
+        return caches[getattr(settings, 'PERMISSION_MATRIX_CACHE_ALIAS', 'default')]
+
+    def shared_version(self):
+        """Текущая версия матрицы в общем кеше (одна на все воркеры)"""
+        version = self._cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            # Начальная версия от времени: после сброса кеша версии (и ETag списков) не повторяются
+            self._cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+            version = self._cache.get(VERSION_CACHE_KEY, 0)
+        return version
+
+    async def ashared_version(self):
+        """Асинхронное чтение версии: кеш в памяти процесса - напрямую, остальные - в потоке"""
+        if isinstance(self._cache, LocMemCache):
+            return self.shared_version()
+        return await sync_to_async(self.shared_version, thread_sensitive=False)()
+
+    def invalidate(self):
+        """Увеличение версии и сброс локальной копии"""
+        try:
+            self._cache.incr(VERSION_CACHE_KEY)
+        except ValueError:
+            self._cache.add(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        with self._lock:
+            self._matrix = None
+
+    def compile(self):
+        """Сборка матрицы одним запросом к AccessRoleRule (и списка элементов)"""
+        from .models import AccessRoleRule, BusinessElement
+
+        version = self.shared_version()
+        rows = AccessRoleRule.objects.values_list('role_id', 'business_element__name', *RULE_FIELDS)
+        matrix = {}
+        by_role = {}
+        for row in rows:
+            mask = pack_flags(row[2:])
+            matrix[(row[0], row[1])] = mask
+            by_role.setdefault(row[0], {})[row[1]] = mask
+        elements = tuple(BusinessElement.objects.order_by('name').values_list('name', flat=True))
+        with self._lock:
+            self._matrix = matrix
+            self._by_role = by_role
+            self._elements = elements
+            self.version = version
+            self._checked_at = time.monotonic()
+        return matrix
+
+    def _check_due(self):
+        # Версию в общем кеше сверяем не чаще одного раза в интервал
+        interval = getattr(settings, 'PERMISSION_MATRIX_CHECK_INTERVAL', 1.0)
+        return time.monotonic() - self._checked_at >= interval
+
+    def _current(self):
+        matrix = self._matrix
+        if matrix is None:
+            return self.compile()
+
+        if self._check_due():
+            if self.shared_version() != self.version:
+                return self.compile()
+            self._checked_at = time.monotonic()
+        return matrix
+
+    def get_mask(self, role_id, element_name):
+        """Битовая маска прав роли на бизнес-элемент"""
+        return self._current().get((role_id, element_name), 0)
+
+    def role_masks(self, role_id):
+        """Маски роли по всем элементам, на которые у нее есть правила"""
+        self._current()
+        return self._by_role.get(role_id, {})
+
+    def element_names(self):
+        """Имена всех бизнес-элементов"""
+        self._current()
+        return self._elements
+
+    def has_permission(self, role_id, element_name, action):
+        bit = ACTION_BITS.get(action)
+        if bit is None:
+            return False
+        return bool(self.get_mask(role_id, element_name) & bit)
+
+    async def ahas_permission(self, role_id, element_name, action):
+        """Асинхронная проверка: сверка версии и сборка матрицы выполняются в потоке"""
+        if self._matrix is None or self._check_due():
+            await sync_to_async(self._current)()
+        return self.has_permission(role_id, element_name, action)
+
+
+permission_matrix = PermissionMatrix()
@@ -0,0 +1,109 @@
+import re
+import threading
+
+from django.urls import URLPattern, URLResolver, get_resolver
+
+# Именованные группы шаблонов повторяются (pk, app_label...), в общем выражении они не нужны
+_NAMED_GROUP = re.compile(r'\(\?P<\w+>')
+
+
+class RoutePolicy:
+    """Политика доступа маршрута: аутентификация, роль staff и бизнес-элемент"""
+
+    def __init__(self, public=False, staff=False, element=None, action=None):
+        self.public = public
+        self.staff = staff
+        self.element = element
+        # Действие для всех методов или словарь {HTTP-метод: действие}
+        self.action = action
+
+    def action_for(self, method):
+        if isinstance(self.action, dict):
+            return self.action.get(method)
+        return self.action
+
+    def __repr__(self):
+        return (f'RoutePolicy(public={self.public}, staff={self.staff}, '
+                f'element={self.element!r}, action={self.action!r})')
+
+
+# Маршрут без объявленной политики доступен любому аутентифицированному пользователю
+DEFAULT_POLICY = RoutePolicy()
+PUBLIC_POLICY = RoutePolicy(public=True)
+
+
+def route_policy(public=False, staff=False, element=None, action=None):
+    """Декоратор представления, объявляющий политику доступа его маршрута"""
+    policy = RoutePolicy(public=public, staff=staff, element=element, action=action)
+
+    def decorator(view):
+        view.route_policy = policy
+        return view
+
+    return decorator
+
+
+def _view_policy(callback):
+    policy = getattr(callback, 'route_policy', None)
+    if policy is None:
+        policy = getattr(getattr(callback, 'view_class', None), 'route_policy', None)
+    return policy
+
+
+class RoutePolicyRegistry:
+    """Политики всех маршрутов, собранные в одно регулярное выражение
+
+    Группа-альтернатива r<N> соответствует N-й политике, поэтому путь
+    сопоставляется с политикой одним вызовом match.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._regex = None
+        self._policies = []
+        self._public_prefixes = ()
+
+    def compile(self, public_prefixes=(), urlconf=None):
+        """Сборка выражения из urlpatterns и публичных префиксов"""
+        entries = []
+        self._collect(get_resolver(urlconf).url_patterns, '', entries)
+        for prefix in public_prefixes:
+            # Префиксы (админка, документация) проверяются после точных маршрутов
+            entries.append((re.escape(prefix.lstrip('/')), PUBLIC_POLICY))
+
+        alternatives = []
+        policies = []
+        for index, (pattern, policy) in enumerate(entries):
+            alternatives.append(f'(?P<r{index}>{_NAMED_GROUP.sub("(?:", pattern)})')
+            policies.append(policy)
+
+        with self._lock:
+            self._regex = re.compile('|'.join(alternatives)) if alternatives else None
+            self._policies = policies
+            self._public_prefixes = tuple(public_prefixes)
+
+    def _collect(self, patterns, prefix, entries):
+        for pattern in patterns:
+            regex = prefix + pattern.pattern.regex.pattern.lstrip('^')
+            if isinstance(pattern, URLResolver):
+                self._collect(pattern.url_patterns, regex.rstrip('$').replace(r'\Z', ''), entries)
+            elif isinstance(pattern, URLPattern):
+                policy = _view_policy(pattern.callback)
+                if policy is not None:
+                    entries.append((regex, policy))
+
+    @property
+    def compiled(self):
+        return self._regex is not None
+
+    def resolve(self, path):
+        """Политика для пути запроса (path_info)"""
+        if self._regex is None:
+            return DEFAULT_POLICY
+        match = self._regex.match(path[1:] if path.startswith('/') else path)
+        if match is None:
+            return DEFAULT_POLICY
+        return self._policies[int(match.lastgroup[1:])]
+
+
+route_policies = RoutePolicyRegistry()
@@ -0,0 +1,97 @@
+"""Кеш ответа GET /api/profile/ по пользователю и условные запросы
+
+В кеше хранится готовое тело ответа с updated_at и ролью пользователя.
+ETag складывается из них и версии матрицы прав, Last-Modified - из
+updated_at, поэтому неизменившийся профиль получает 304 без запросов к БД
+и без сериализации. Запись удаляется после каждого сохранения пользователя
+(сигнал в core.signals) и истекает через PROFILE_CACHE['TIMEOUT'] (изменения
+через QuerySet.update() без сигналов). Кеш включается PROFILE_CACHE['ENABLED'];
+без него 304 отдается после чтения одной строки профиля.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import CustomUser
+from .renderers import dumps
+from .serializers import PROFILE_FIELDS, profile_data
+
+
+def _config():
+    return getattr(settings, 'PROFILE_CACHE', {})
+
+
+def _cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def _key(user_id):
+    return f'core:profile:{user_id}'
+
+
+def _entry(row):
+    return {
+        'body': dumps(profile_data(row)),
+        'modified': row['updated_at'].timestamp(),
+        'role_id': row['role_id'],
+    }
+
+
+def _profile_row():
+    return CustomUser.objects.values(*PROFILE_FIELDS, 'updated_at', 'role_id')
+
+
+def _enabled():
+    return _config().get('ENABLED', False)
+
+
+def cached_profile(user_id):
+    """Запись кеша профиля; при промахе или выключенном кеше - одна строка из БД"""
+    if not _enabled():
+        return _entry(_profile_row().get(id=user_id))
+    cache = _cache()
+    entry = cache.get(_key(user_id))
+    if entry is None:
+        entry = _entry(_profile_row().get(id=user_id))
+        cache.set(_key(user_id), entry, timeout=_config().get('TIMEOUT', 300))
+    return entry
+
+
+async def acached_profile(user_id):
+    if not _enabled():
+        return _entry(await _profile_row().aget(id=user_id))
+    cache = _cache()
+    # Кеш в памяти процесса читаем напрямую, как в core.auth
+    local = isinstance(cache, LocMemCache)
+    key = _key(user_id)
+    entry = cache.get(key) if local else await cache.aget(key)
+    if entry is None:
+        entry = _entry(await _profile_row().aget(id=user_id))
+        timeout = _config().get('TIMEOUT', 300)
+        if local:
+            cache.set(key, entry, timeout=timeout)
+        else:
+            await cache.aset(key, entry, timeout=timeout)
+    return entry
+
+
+def profile_response(request, user_id, entry, permission_version):
+    """Ответ 200 из кеша или 304 по If-None-Match / If-Modified-Since"""
+    etag = quote_etag(f"{user_id}-{entry['modified']:.6f}-{entry['role_id']}-{permission_version}")
+    response = get_conditional_response(request, etag=etag, last_modified=int(entry['modified']))
+    if response is None:
+        response = HttpResponse(entry['body'], content_type='application/json')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['modified'])
+    # Ответ зависит от пользователя: хранить только у клиента и каждый раз сверять
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def invalidate_profile(user_id):
+    if _enabled():
+        _cache().delete(_key(user_id))
+
@@ -0,0 +1,140 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+from .sharedstore import SharedStoreClient, SharedStoreError, SlidingWindowCounter
+
+logger = logging.getLogger(__name__)
+
+rate_limited = registry.counter(
+    'login_rate_limited_total',
+    'Число попыток входа, отклоненных ограничением частоты',
+    labelnames=('scope',),
+)
+
+
+class LocalRateLimitBackend:
+    """Счетчики попыток в памяти процесса (один воркер)"""
+
+    remote = False
+
+    def __init__(self, **options):
+        self.counters = SlidingWindowCounter()
+
+    def hit(self, key, limit, window, lockout, max_lockout):
+        return self.counters.hit(key, limit, window, lockout, max_lockout)
+
+    def reset(self, key):
+        self.counters.reset(key)
+
+
+class SocketRateLimitBackend:
+    """Счетчики попыток на сервере общего хранилища (manage.py sharedstore)
+
+    Для Redis тот же hit можно выполнить Lua-скриптом над хешем ключа.
+    """
+
+    remote = True
+
+    def __init__(self, HOST='127.0.0.1', PORT=7379, TIMEOUT=0.5):
+        self.client = SharedStoreClient(HOST, PORT, TIMEOUT)
+
+    def hit(self, key, limit, window, lockout, max_lockout):
+        response = self.client.call(
+            'ratelimit_hit', key=key, limit=limit, window=window,
+            lockout=lockout, max_lockout=max_lockout
+        )
+        return response['retry_after']
+
+    def reset(self, key):
+        self.client.call('ratelimit_reset', key=key)
+
+
+class LoginRateLimiter:
+    """Ограничение частоты попыток входа по email и по IP клиента
+
+    Проверка выполняется до чтения пользователя из БД и до bcrypt, поэтому
+    перебор паролей не расходует CPU сверх лимита. Каждая попытка учитывается,
+    успешный вход сбрасывает счетчик email. При недоступности общего
+    хранилища вход не блокируется.
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    @property
+    def config(self):
+        return getattr(settings, 'LOGIN_RATE_LIMIT', {})
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            backend_class = import_string(
+                self.config.get('BACKEND', 'core.ratelimit.LocalRateLimitBackend')
+            )
+            self._backend = backend_class(**self.config.get('OPTIONS', {}))
+        return self._backend
+
+    def client_ip(self, request):
+        if self.config.get('USE_X_FORWARDED_FOR', False):
+            forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+            if forwarded:
+                return forwarded.split(',')[0].strip()
+        return request.META.get('REMOTE_ADDR', '')
+
+    def _scopes(self, request, email):
+        return (
+            ('ip', f'login:ip:{self.client_ip(request)}'),
+            ('email', f'login:email:{email.lower()}'),
+        )
+
+    def check(self, request, email):
+        """Учет попытки входа; 0, если она разрешена, иначе Retry-After в секундах"""
+        config = self.config
+        if not config.get('ENABLED', True):
+            return 0
+        lockout = config.get('LOCKOUT', 30)
+        max_lockout = config.get('MAX_LOCKOUT', 3600)
+        for scope, key in self._scopes(request, email):
+            limits = config.get(scope.upper(), {})
+            try:
+                retry_after = self.backend.hit(
+                    key, limits.get('LIMIT', 10), limits.get('WINDOW', 60), lockout, max_lockout
+                )
+            except SharedStoreError as e:
+                logger.warning('Не удалось проверить частоту попыток входа: %s', e)
+                return 0
+            if retry_after:
+                rate_limited.labels(scope=scope).inc()
+                return max(1, int(retry_after + 0.999))
+        return 0
+
+    def reset(self, email):
+        """Сброс счетчика email после успешного входа"""
+        if not self.config.get('ENABLED', True):
+            return
+        try:
+            self.backend.reset(f'login:email:{email.lower()}')
+        except SharedStoreError as e:
+            logger.warning('Не удалось сбросить счетчик попыток входа: %s', e)
+
+    async def acheck(self, request, email):
+        """Асинхронная проверка: запрос к общему хранилищу выполняется в потоке"""
+        if self.backend.remote:
+            return await sync_to_async(self.check, thread_sensitive=False)(request, email)
+        return self.check(request, email)
+
+    async def areset(self, email):
+        if self.backend.remote:
+            await sync_to_async(self.reset, thread_sensitive=False)(email)
+        else:
+            self.reset(email)
+
+    def clear(self):
+        self._backend = None
+
+
+login_rate_limiter = LoginRateLimiter()
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from . import partitioning
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+
+def get_replication_lag():
+    """Максимальное отставание реплик в секундах (0, если реплик нет или СУБД не PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT COALESCE(MAX(EXTRACT(EPOCH FROM replay_lag)), 0) FROM pg_stat_replication'
+        )
+        return float(cursor.fetchone()[0])
+
+
+class SessionReaper:
+    """Удаление истекших и неактивных сессий порциями"""
+
+    def __init__(self, batch_size=None, batch_pause=None, max_replication_lag=None):
+        config = getattr(settings, 'SESSION_REAPER', {})
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 1000)
+        self.batch_pause = config.get('BATCH_PAUSE', 0.0) if batch_pause is None else batch_pause
+        self.max_replication_lag = (
+            config.get('MAX_REPLICATION_LAG', 5.0) if max_replication_lag is None else max_replication_lag
+        )
+
+    def _wait_for_replicas(self):
+        # Не даем удалению увеличивать отставание реплик сверх допустимого
+        while self.max_replication_lag and get_replication_lag() > self.max_replication_lag:
+            time.sleep(1.0)
+
+    def _delete_batch(self, condition):
+        ids = list(
+            UserSession.objects.filter(condition).values_list('id', flat=True)[:self.batch_size]
+        )
+        if not ids:
+            return 0
+        deleted, _ = UserSession.objects.filter(id__in=ids).delete()
+        return deleted
+
+    def run(self, max_batches=None, report=None):
+        """Очистка до конца (или до max_batches порций); возвращает (строк, секунд)"""
+        started = time.perf_counter()
+        now = timezone.now()
+        total = 0
+        batches = 0
+
+        if getattr(settings, 'SESSION_PARTITIONING', {}).get('ENABLED') and partitioning.is_partitioned(connection):
+            partitioning.ensure_partitions(
+                connection, now, settings.SESSION_PARTITIONING.get('MONTHS_AHEAD', 3)
+            )
+            for name in partitioning.drop_expired_partitions(connection, now):
+                if report:
+                    report(f'Удалена секция {name}')
+
+        # Сначала истекшие (индекс по expires_at), затем неактивные (частичный индекс)
+        for condition in (Q(expires_at__lt=now), Q(is_active=False)):
+            while max_batches is None or batches < max_batches:
+                self._wait_for_replicas()
+                deleted = self._delete_batch(condition)
+                if not deleted:
+                    break
+                total += deleted
+                batches += 1
+                if report:
+                    elapsed = time.perf_counter() - started
+                    report(f'Удалено {total} сессий, {total / elapsed:.0f} строк/с')
+                if deleted < self.batch_size:
+                    break
+                if self.batch_pause:
+                    time.sleep(self.batch_pause)
+
+        return total, time.perf_counter() - started
+
+
+class PeriodicReaper:
+    """Фоновый поток, запускающий очистку сессий раз в INTERVAL секунд"""
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        config = getattr(settings, 'SESSION_REAPER', {})
+        if not config.get('ENABLED'):
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._loop, args=(config.get('INTERVAL', 300),),
+                name='session-reaper', daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                deleted, elapsed = SessionReaper().run()
+                if deleted:
+                    logger.info('Удалено %s сессий за %.1f с', deleted, elapsed)
+            except Exception:
+                logger.exception('Ошибка очистки сессий')
+            finally:
+                connection.close()
+
+
+periodic_reaper = PeriodicReaper()
@@ -0,0 +1,74 @@
+"""JSON для API: orjson, если установлен, иначе стандартный json
+
+Формат ответа совпадает с JSONRenderer из DRF: компактный JSON без
+экранирования не-ASCII символов. Бэкенд выбирается настройкой JSON_BACKEND:
+'auto' (orjson при наличии), 'orjson' или 'stdlib'.
+"""
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_default(value):
+    # Decimal - как в JSONEncoder из DRF; остальное (ленивые строки переводов) - строкой
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def orjson_dumps(data):
+    return orjson.dumps(data, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_backend():
+    backend = getattr(settings, 'JSON_BACKEND', 'auto')
+    if backend == 'orjson' and orjson is None:
+        raise ImportError("JSON_BACKEND='orjson', но пакет orjson не установлен")
+    if backend == 'stdlib' or orjson is None:
+        return 'stdlib'
+    return 'orjson'
+
+
+if json_backend() == 'orjson':
+    dumps, loads = orjson_dumps, orjson.loads
+else:
+    dumps, loads = stdlib_dumps, json.loads
+
+
+class JSONRenderer(renderers.BaseRenderer):
+    """Замена rest_framework.renderers.JSONRenderer на dumps выбранного бэкенда"""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return dumps(data)
+
+
+class JSONParser(parsers.BaseParser):
+    """Замена rest_framework.parsers.JSONParser на loads выбранного бэкенда"""
+
+    media_type = 'application/json'
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,163 @@
+import bisect
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .sharedstore import SharedStoreClient, SharedStoreError
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRevocationBackend:
+    """Журнал отозванных токенов в памяти процесса (один воркер)"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        # Курсор - номер последней записи; номера не сдвигаются при удалении истекших записей
+        self._seq = 0
+        self._seqs = []
+        self._entries = []
+
+    def revoke(self, jti, expires_at):
+        with self._lock:
+            self._seq += 1
+            self._seqs.append(self._seq)
+            self._entries.append((jti, expires_at))
+
+    def fetch_since(self, cursor):
+        """Новые записи после курсора: (новый курсор, [(jti, exp), ...])"""
+        with self._lock:
+            self._purge_expired()
+            index = bisect.bisect_right(self._seqs, cursor)
+            return self._seq, self._entries[index:]
+
+    def _purge_expired(self):
+        now = time.time()
+        if not self._entries or min(exp for _, exp in self._entries) > now:
+            return
+        alive = [(seq, entry) for seq, entry in zip(self._seqs, self._entries) if entry[1] > now]
+        self._seqs = [seq for seq, _ in alive]
+        self._entries = [entry for _, entry in alive]
+
+
+class SocketRevocationBackend:
+    """Журнал отозванных токенов на сервере общего хранилища (manage.py sharedstore)
+
+    Для Redis достаточно реализовать те же revoke/fetch_since, например на потоке
+    (XADD/XRANGE) с курсором по идентификатору записи.
+    """
+
+    def __init__(self, HOST='127.0.0.1', PORT=7379, TIMEOUT=0.5):
+        self.client = SharedStoreClient(HOST, PORT, TIMEOUT)
+        self._instance = None
+
+    def revoke(self, jti, expires_at):
+        self.client.call('revoke', jti=jti, exp=expires_at)
+
+    def fetch_since(self, cursor):
+        response = self.client.call('revoked_since', cursor=cursor)
+        if response['instance'] != self._instance:
+            # Сервер перезапущен: его нумерация началась заново
+            self._instance = response['instance']
+            if cursor:
+                response = self.client.call('revoked_since', cursor=0)
+        return response['seq'], [tuple(entry) for entry in response['entries']]
+
+
+class RevocationSet:
+    """Локальное зеркало отозванных jti с синхронизацией через бэкенд
+
+    Проверка выполняется по словарю в памяти, без SQL. Отзывы других воркеров
+    становятся видны не позже чем через SYNC_INTERVAL секунд.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._revoked = {}
+        self._cursor = 0
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+        # Защищает изменения _revoked; чтение идет без блокировки
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return getattr(settings, 'TOKEN_REVOCATION', {})
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            backend_class = import_string(
+                self.config.get('BACKEND', 'core.revocation.LocalRevocationBackend')
+            )
+            self._backend = backend_class(**self.config.get('OPTIONS', {}))
+        return self._backend
+
+    def revoke(self, jti, expires_at):
+        """Отзыв токена по jti до момента его истечения"""
+        if not jti:
+            return
+        with self._lock:
+            self._revoked[jti] = expires_at
+        try:
+            self.backend.revoke(jti, expires_at)
+        except SharedStoreError as e:
+            logger.error('Не удалось передать отзыв токена %s: %s', jti, e)
+
+    def is_revoked(self, *jtis):
+        """Отозван ли хотя бы один из идентификаторов (jti токена, sid его сессии)"""
+        self._maybe_sync()
+        return any(jti in self._revoked for jti in jtis if jti)
+
+    async def ais_revoked(self, *jtis):
+        """Асинхронная проверка: синхронизация с бэкендом выполняется в потоке"""
+        if self._sync_due():
+            await sync_to_async(self._maybe_sync, thread_sensitive=False)()
+        return any(jti in self._revoked for jti in jtis if jti)
+
+    def sync(self):
+        """Загрузка отзывов, появившихся в бэкенде после прошлой синхронизации"""
+        try:
+            cursor, entries = self.backend.fetch_since(self._cursor)
+        except SharedStoreError as e:
+            logger.warning('Не удалось синхронизировать отозванные токены: %s', e)
+            return
+        now = time.time()
+        with self._lock:
+            # Новый словарь вместо удаления на месте: проверки в других потоках читают старый.
+            # Истекшие токены и так не пройдут проверку подписи
+            revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+            for jti, expires_at in entries:
+                if expires_at > now:
+                    revoked[jti] = expires_at
+            self._revoked = revoked
+        self._cursor = cursor
+
+    def _sync_due(self):
+        return time.monotonic() - self._synced_at >= self.config.get('SYNC_INTERVAL', 1.0)
+
+    def _maybe_sync(self):
+        if not self._sync_due():
+            return
+        # Синхронизирует один поток, остальные работают с текущим зеркалом
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._synced_at = time.monotonic()
+            self.sync()
+        finally:
+            self._sync_lock.release()
+
+    def clear(self):
+        self._backend = None
+        with self._lock:
+            self._revoked = {}
+        self._cursor = 0
+        self._synced_at = 0.0
+
+
+revocation_set = RevocationSet()
@@ -0,0 +1,117 @@
+"""Маршрутизация чтений аутентификации на реплики БД
+
+Реплики перечислены в DATABASE_REPLICATION['REPLICAS']. На реплику уходят
+только чтения пользователей, ролей, элементов и правил и только внутри
+безопасных HTTP-запросов (GET, HEAD, OPTIONS), которые разрешил
+ReplicaPinMiddleware. Записи, UserSession, команды manage.py и фоновые
+потоки всегда работают с основной БД.
+
+Чтобы клиент видел свои изменения, несмотря на задержку репликации,
+основная БД закрепляется за запросом, если токен выдан недавно (вход или
+обновление токена), и за пользователем на PIN_SECONDS после его успешного
+изменяющего запроса.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+import jwt
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_MODELS = frozenset({
+    'core.customuser',
+    'core.role',
+    'core.businesselement',
+    'core.accessrolerule',
+    'core.rolepermissions',
+})
+
+# Разрешено ли текущему запросу читать с реплик; вне запроса - нет
+_use_replica = ContextVar('core_use_replica', default=False)
+
+
+def replication_config():
+    return getattr(settings, 'DATABASE_REPLICATION', {})
+
+
+def replicas():
+    """Псевдонимы реплик, описанных в DATABASES"""
+    return [alias for alias in replication_config().get('REPLICAS', ()) if alias in settings.DATABASES]
+
+
+def allow_replica_reads(allowed):
+    """Разрешение чтений с реплик в текущем контексте; возвращает токен для reset_replica_reads"""
+    return _use_replica.set(allowed)
+
+
+def reset_replica_reads(token):
+    _use_replica.reset(token)
+
+
+def _pin_cache():
+    return caches[replication_config().get('CACHE_ALIAS', 'default')]
+
+
+def _pin_key(user_id):
+    return f'core:db_pin:{user_id}'
+
+
+def pin_seconds():
+    return replication_config().get('PIN_SECONDS', 5)
+
+
+def token_claims(token):
+    """user_id и iat из токена без проверки подписи
+
+    Используются только для выбора БД: поддельный токен в худшем случае
+    отправит чтения на основную БД, аутентификация проверяет его полностью.
+    """
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except jwt.InvalidTokenError:
+        return None, None
+    return payload.get('user_id'), payload.get('iat')
+
+
+def fresh_token(iat):
+    """Токен выдан меньше PIN_SECONDS назад: его сессия и пользователь могли не дойти до реплики"""
+    return isinstance(iat, (int, float)) and time.time() - iat < pin_seconds()
+
+
+def pin_user(user_id):
+    """Чтения пользователя идут на основную БД PIN_SECONDS после его изменения"""
+    _pin_cache().set(_pin_key(user_id), 1, timeout=pin_seconds())
+
+
+def user_pinned(user_id):
+    return _pin_cache().get(_pin_key(user_id)) is not None
+
+
+async def apin_user(user_id):
+    await _pin_cache().aset(_pin_key(user_id), 1, timeout=pin_seconds())
+
+
+async def auser_pinned(user_id):
+    return await _pin_cache().aget(_pin_key(user_id)) is not None
+
+
+class ReplicaRouter:
+    """Чтения моделей аутентификации - на случайную реплику, остальное - на основную БД"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        aliases = replicas()
+        return random.choice(aliases) if aliases else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -1,5 +1,7 @@
+from django.db.models import F
 from rest_framework import serializers
 from .models import CustomUser, Role, BusinessElement, AccessRoleRule
+from .permissions import ACTIONS, RULE_FIELDS
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -23,6 +25,9 @@ class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField()
 
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
 class UserUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
@@ -46,4 +51,132 @@ class AccessRoleRuleSerializer(serializers.ModelSerializer):
 class AccessRoleRuleUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = AccessRoleRule
-        exclude = ('role', 'business_element')
\ No newline at end of file
+        exclude = ('role', 'business_element')
+
+class RowSerializer:
+    """Сериализатор только для чтения: ответ строится из строк .values() без обхода полей
+
+    fields задается один раз для класса: имя в ответе -> поле модели или путь
+    через связь. ?fields=id,name сужает SELECT, неизвестные поля - ошибка 400;
+    id выбирается всегда, по нему строится курсор страниц.
+    """
+
+    fields = {}
+
+    def __init__(self, request=None):
+        requested = request.query_params.get('fields') if request is not None else None
+        if requested:
+            names = {name.strip() for name in requested.split(',')} - {''}
+            unknown = sorted(names - set(self.fields))
+            if unknown or not names:
+                raise serializers.ValidationError({
+                    'fields': [f"Неизвестные поля: {', '.join(unknown)}" if unknown else 'Не указано ни одного поля'],
+                })
+            self.selected = {name: source for name, source in self.fields.items() if name in names}
+        else:
+            self.selected = self.fields
+        self.strip_id = 'id' not in self.selected
+
+    def values(self, queryset):
+        plain = [name for name, source in self.selected.items() if name == source]
+        renamed = {name: F(source) for name, source in self.selected.items() if name != source}
+        if self.strip_id:
+            plain.append('id')
+        return queryset.values(*plain, **renamed)
+
+    def rows(self, rows):
+        if self.strip_id:
+            return [{name: value for name, value in row.items() if name != 'id'} for row in rows]
+        return list(rows)
+
+class RoleRowSerializer(RowSerializer):
+    fields = {'id': 'id', 'name': 'name', 'description': 'description'}
+
+class AccessRuleRowSerializer(RowSerializer):
+    fields = {
+        'id': 'id',
+        'role': 'role',
+        'business_element': 'business_element',
+        # Имена читаются тем же запросом (JOIN), без отдельных запросов клиента по id
+        'role_name': 'role__name',
+        'business_element_name': 'business_element__name',
+        **{field: field for field in RULE_FIELDS},
+    }
+
+PROFILE_FIELDS = ('first_name', 'last_name', 'email')
+
+def profile_data(row):
+    """Профиль для ответа из строки .values(): те же поля, что у UserUpdateSerializer"""
+    return {field: row[field] for field in PROFILE_FIELDS}
+
+def login_data(user, tokens):
+    """Ответ на вход: пара токенов и краткие данные пользователя"""
+    return {
+        **tokens,
+        'user': {
+            'id': user.id,
+            'email': user.email,
+            'first_name': user.first_name,
+            'last_name': user.last_name,
+        },
+    }
+
+class AccessRuleBulkItemSerializer(serializers.Serializer):
+    role = serializers.CharField(max_length=50)
+    element = serializers.CharField(max_length=50)
+    # Не переданные флаги сохраняют текущее значение (у нового правила - False)
+    can_read = serializers.BooleanField(required=False)
+    can_create = serializers.BooleanField(required=False)
+    can_update = serializers.BooleanField(required=False)
+    can_delete = serializers.BooleanField(required=False)
+    can_read_all = serializers.BooleanField(required=False)
+    can_update_all = serializers.BooleanField(required=False)
+    can_delete_all = serializers.BooleanField(required=False)
+
+class AccessRuleBulkSerializer(serializers.Serializer):
+    rules = AccessRuleBulkItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_rules(self, value):
+        # Роли и элементы по именам - двумя запросами на весь список
+        roles = dict(Role.objects.filter(name__in={item['role'] for item in value}).values_list('name', 'id'))
+        elements = dict(BusinessElement.objects.filter(
+            name__in={item['element'] for item in value}
+        ).values_list('name', 'id'))
+
+        errors = []
+        seen = set()
+        for index, item in enumerate(value):
+            key = (item['role'], item['element'])
+            if item['role'] not in roles:
+                errors.append(f'{index}: роль {item["role"]} не найдена')
+            elif item['element'] not in elements:
+                errors.append(f'{index}: элемент {item["element"]} не найден')
+            elif key in seen:
+                errors.append(f'{index}: повтор правила {item["role"]}/{item["element"]}')
+            seen.add(key)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return [
+            (roles[item['role']], elements[item['element']],
+             {field: item[field] for field in RULE_FIELDS if field in item})
+            for item in value
+        ]
+
+class PermissionPairSerializer(serializers.Serializer):
+    element = serializers.CharField(max_length=50)
+    action = serializers.ChoiceField(choices=ACTIONS)
+
+class PermissionEvaluateSerializer(serializers.Serializer):
+    pairs = serializers.JSONField()
+
+    def validate_pairs(self, value):
+        # "all" - все элементы и все действия
+        if value == 'all':
+            return None
+        serializer = PermissionPairSerializer(data=value, many=True)
+        if not isinstance(value, list) or not serializer.is_valid():
+            raise serializers.ValidationError(
+                'Ожидается "all" или список объектов {"element": ..., "action": ...}'
+            )
+        return [(pair['element'], pair['action']) for pair in serializer.validated_data]
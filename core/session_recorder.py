@@ -0,0 +1,282 @@
+"""Отложенная запись сессий (write-behind)
+
+При SESSION_WRITE_BEHIND['ENABLED'] вход не ждет INSERT в UserSession:
+сессия ставится в очередь в памяти и дописывается в журнал на диске, а
+фоновый поток записывает очередь одним bulk_create раз в INTERVAL секунд
+или по накоплении BATCH_SIZE сессий.
+
+Журнал - файлы sessions-*.jsonl в JOURNAL_DIR, по одному на порцию; файл
+удаляется после записи порции в БД. Пока процесс жив, его файлы заблокированы
+(flock), поэтому незаблокированные файлы остались от завершившихся процессов:
+они записываются в БД при запуске потока или командой flush_session_journal.
+
+Обмен refresh-токена, выход и удаление аккаунта сначала записывают ожидающие
+сессии этого процесса (flush_pending).
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from .metrics import registry
+from .models import UserSession
+
+try:
+    import fcntl
+except ImportError:
+    # Без flock (Windows) файлы живых процессов не отличить: журнал восстанавливается только командой
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATTERN = 'sessions-*.jsonl'
+
+flush_duration = registry.histogram(
+    'session_flush_duration_seconds',
+    'Время записи порции отложенных сессий в БД',
+)
+pending_sessions = registry.gauge(
+    'session_write_behind_pending',
+    'Сессии, ожидающие записи в БД',
+)
+
+
+def session_record(session):
+    """Запись журнала для новой сессии"""
+    return {
+        'jti': session.jti.hex,
+        'user_id': session.user_id,
+        'expires_at': session.expires_at.isoformat(),
+    }
+
+
+def session_from_record(record):
+    return UserSession(
+        jti=uuid.UUID(record['jti']),
+        user_id=record['user_id'],
+        expires_at=datetime.fromisoformat(record['expires_at']),
+    )
+
+
+def write_sessions(records):
+    """Запись сессий одним bulk_create; уже записанные пропускаются
+
+    Если пользователь удален до записи его сессии, порция пишется по одной
+    сессии, а сессии удаленных пользователей отбрасываются.
+    """
+    sessions = [session_from_record(record) for record in records]
+    try:
+        with transaction.atomic():
+            UserSession.objects.bulk_create(sessions, ignore_conflicts=True)
+        return len(sessions)
+    except IntegrityError:
+        written = 0
+        for session in sessions:
+            try:
+                with transaction.atomic():
+                    UserSession.objects.bulk_create([session], ignore_conflicts=True)
+                written += 1
+            except IntegrityError:
+                logger.warning('Сессия %s не записана: пользователь %s удален', session.jti, session.user_id)
+        return written
+
+
+def recover_journal(journal_dir):
+    """Запись в БД сессий из журналов завершившихся процессов; возвращает число сессий"""
+    total = 0
+    for path in sorted(Path(journal_dir).glob(JOURNAL_PATTERN)):
+        try:
+            file = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            continue
+        with file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Журнал живого процесса
+                    continue
+            records = []
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Строка, недописанная при аварийном завершении
+                    continue
+            if records:
+                total += write_sessions(records)
+            path.unlink(missing_ok=True)
+    return total
+
+
+class JournalSegment:
+    """Файл журнала одной порции, заблокированный процессом до ее записи в БД"""
+
+    def __init__(self, journal_dir):
+        name = f'sessions-{os.getpid()}-{uuid.uuid4().hex[:12]}'
+        tmp_path = Path(journal_dir) / f'{name}.tmp'
+        self.path = Path(journal_dir) / f'{name}.jsonl'
+        self.file = open(tmp_path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        # Файл получает имя журнала уже заблокированным: восстановление в другом процессе его пропустит
+        os.replace(tmp_path, self.path)
+
+    def append(self, record, fsync=False):
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        # Данные в кеше ОС переживают завершение процесса; fsync - и отключение питания
+        self.file.flush()
+        if fsync:
+            os.fsync(self.file.fileno())
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+        self.file.close()
+
+
+class SessionRecorder:
+    """Очередь новых сессий с фоновой записью порциями"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = {}
+        # Порция, которая сейчас записывается в БД
+        self._inflight = {}
+        self._segment = None
+        # Журналы порций, запись которых в БД не удалась
+        self._sealed = []
+        self._thread = None
+
+    @property
+    def config(self):
+        return getattr(settings, 'SESSION_WRITE_BEHIND', {})
+
+    @property
+    def enabled(self):
+        return self.config.get('ENABLED', False)
+
+    @property
+    def journal_dir(self):
+        return Path(self.config.get('JOURNAL_DIR') or Path(settings.BASE_DIR) / 'var' / 'sessions')
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            self._thread = threading.Thread(target=self._loop, name='session-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def record(self, session):
+        """Сохранение новой сессии: сразу или, если включена отложенная запись, через очередь"""
+        if not self.enabled:
+            session.save()
+            return
+        self.start()
+        record = session_record(session)
+        with self._lock:
+            if self._segment is None:
+                self._segment = JournalSegment(self.journal_dir)
+            self._segment.append(record, fsync=self.config.get('FSYNC', False))
+            self._pending[record['jti']] = record
+            size = len(self._pending)
+        pending_sessions.set(size)
+        if size >= self.config.get('BATCH_SIZE', 500):
+            self._wakeup.set()
+
+    async def arecord(self, session):
+        if not self.enabled:
+            await session.asave()
+            return
+        # Постановка в очередь - запись строки в файл без ожидания диска, поток не нужен
+        self.record(session)
+
+    def flush(self):
+        """Запись очереди в БД; возвращает число записанных сессий"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                segments = self._sealed
+                if self._segment is not None:
+                    segments.append(self._segment)
+                self._sealed, self._segment = [], None
+            if not batch:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                written = write_sessions(batch.values())
+            except Exception:
+                logger.exception('Не удалось записать %s сессий, повтор при следующей записи', len(batch))
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                    self._sealed = segments + self._sealed
+                    self._inflight = {}
+                return 0
+            flush_duration.observe(time.perf_counter() - started)
+
+            with self._lock:
+                self._inflight = {}
+                size = len(self._pending)
+            pending_sessions.set(size)
+            for segment in segments:
+                segment.remove()
+            return written
+
+    def flush_pending(self, jti=None, user_id=None):
+        """Запись очереди, если в ней есть сессия jti или сессии пользователя user_id"""
+        if not self.enabled:
+            return
+        with self._lock:
+            batches = (self._pending, self._inflight)
+            if jti is not None:
+                found = any(jti.hex in batch for batch in batches)
+            else:
+                found = any(record['user_id'] == user_id for batch in batches for record in batch.values())
+        if found:
+            # Если порцию с сессией записывает фоновый поток, flush дождется ее записи
+            self.flush()
+
+    async def aflush_pending(self, jti=None, user_id=None):
+        if self.enabled:
+            await sync_to_async(self.flush_pending)(jti=jti, user_id=user_id)
+
+    def _loop(self):
+        try:
+            recovered = recover_journal(self.journal_dir)
+            if recovered:
+                logger.info('Из журнала записано %s сессий завершившихся процессов', recovered)
+        except Exception:
+            logger.exception('Ошибка восстановления сессий из журнала')
+
+        interval = self.config.get('INTERVAL', 0.05)
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Ошибка записи сессий')
+            finally:
+                close_old_connections()
+
+
+session_recorder = SessionRecorder()
@@ -0,0 +1,200 @@
+"""Простое общее хранилище для нескольких воркеров
+
+Сервер держит данные в памяти и принимает команды по TCP: одна строка JSON
+на запрос и одна на ответ. Используется как локальная замена Redis; для
+перехода на Redis достаточно бэкенда с тем же интерфейсом.
+"""
+import bisect
+import json
+import socket
+import socketserver
+import threading
+import time
+import uuid
+
+
+class SharedStoreError(Exception):
+    """Ошибка обращения к общему хранилищу"""
+
+
+class SlidingWindowCounter:
+    """Счетчики попыток по ключам: скользящее окно и блокировка с удвоением срока
+
+    Для ключа хранятся счетчики текущего и предыдущего окна, поэтому проверка
+    выполняется за O(1): число попыток за последние window секунд оценивается
+    как previous * (доля предыдущего окна) + current. При превышении лимита
+    ключ блокируется на lockout * 2^k секунд (k - число прошлых блокировок),
+    но не дольше max_lockout.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [начало окна, previous, current, заблокирован до, число блокировок]
+        self._keys = {}
+        self._purged_at = time.time()
+
+    def hit(self, key, limit, window, lockout, max_lockout, now=None):
+        """Учет попытки; 0, если она разрешена, иначе секунды до снятия блокировки"""
+        now = time.time() if now is None else now
+        with self.lock:
+            self._maybe_purge(now, window, max_lockout)
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = [0.0, 0, 0, 0.0, 0]
+            if state[3] > now:
+                return state[3] - now
+
+            window_start = now - now % window
+            if window_start != state[0]:
+                state[1] = state[2] if window_start - state[0] == window else 0
+                state[2] = 0
+                state[0] = window_start
+
+            estimated = state[1] * (1 - (now - window_start) / window) + state[2]
+            if estimated >= limit:
+                duration = min(lockout * 2 ** state[4], max_lockout)
+                state[3] = now + duration
+                state[4] += 1
+                return duration
+
+            state[2] += 1
+            return 0
+
+    def reset(self, key):
+        with self.lock:
+            self._keys.pop(key, None)
+
+    def _maybe_purge(self, now, window, max_lockout):
+        # Ключ без попыток в двух последних окнах больше не влияет на оценку;
+        # после блокировки он хранится еще max_lockout, чтобы помнить число блокировок
+        if now - self._purged_at < window:
+            return
+        self._purged_at = now
+        stale = [
+            key for key, state in self._keys.items()
+            if state[0] + 2 * window < now and (not state[4] or state[3] + max_lockout < now)
+        ]
+        for key in stale:
+            del self._keys[key]
+
+
+class SharedStore:
+    """Данные сервера: журнал отозванных токенов и счетчики попыток входа"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Идентификатор запуска: клиент сбрасывает курсор после перезапуска сервера
+        self.instance_id = uuid.uuid4().hex
+        self._seq = 0
+        self._revoked_seqs = []
+        self._revoked = []
+        self.counters = SlidingWindowCounter()
+
+    def revoke(self, jti, expires_at):
+        with self.lock:
+            self._seq += 1
+            self._revoked_seqs.append(self._seq)
+            self._revoked.append((jti, expires_at))
+            return self._seq
+
+    def revoked_since(self, cursor):
+        with self.lock:
+            self._purge_expired()
+            index = bisect.bisect_right(self._revoked_seqs, cursor)
+            return self._seq, self._revoked[index:]
+
+    def _purge_expired(self):
+        now = time.time()
+        if not self._revoked or min(exp for _, exp in self._revoked) > now:
+            return
+        alive = [
+            (seq, entry) for seq, entry in zip(self._revoked_seqs, self._revoked)
+            if entry[1] > now
+        ]
+        self._revoked_seqs = [seq for seq, _ in alive]
+        self._revoked = [entry for _, entry in alive]
+
+    def execute(self, command):
+        op = command.get('op')
+        if op == 'revoke':
+            return {'seq': self.revoke(command['jti'], command['exp'])}
+        if op == 'revoked_since':
+            seq, entries = self.revoked_since(command.get('cursor', 0))
+            return {'seq': seq, 'entries': entries}
+        if op == 'ratelimit_hit':
+            retry_after = self.counters.hit(
+                command['key'], command['limit'], command['window'],
+                command['lockout'], command['max_lockout']
+            )
+            return {'retry_after': retry_after}
+        if op == 'ratelimit_reset':
+            self.counters.reset(command['key'])
+            return {}
+        if op == 'ping':
+            return {}
+        raise SharedStoreError(f'Неизвестная команда: {op}')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        store = self.server.store
+        for line in self.rfile:
+            try:
+                result = store.execute(json.loads(line))
+                response = {'ok': True, 'instance': store.instance_id, **result}
+            except (SharedStoreError, KeyError, ValueError) as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+
+
+class SharedStoreServer(socketserver.ThreadingTCPServer):
+    """TCP-сервер общего хранилища"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, _RequestHandler)
+        self.store = SharedStore()
+
+
+class SharedStoreClient:
+    """Клиент общего хранилища с одним постоянным соединением"""
+
+    def __init__(self, host='127.0.0.1', port=7379, timeout=0.5):
+        self.address = (host, port)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile('rb')
+
+    def _close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+        self._sock = None
+        self._file = None
+
+    def call(self, op, **params):
+        """Выполнение команды на сервере"""
+        request = json.dumps({'op': op, **params}).encode('utf-8') + b'\n'
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                self._sock.sendall(request)
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError('Соединение закрыто сервером')
+            except OSError as e:
+                self._close()
+                raise SharedStoreError(str(e)) from e
+        response = json.loads(line)
+        if not response.pop('ok'):
+            raise SharedStoreError(response.get('error'))
+        return response
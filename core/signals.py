@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .auth import publish_auth_epoch, publish_user_deleted
+from .models import CustomUser, Role, BusinessElement, AccessRoleRule
+from .permissions import permission_matrix, rebuild_role_permissions
+from .profile_cache import invalidate_profile
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(post_save, sender=BusinessElement)
+@receiver(post_delete, sender=BusinessElement)
+@receiver(post_save, sender=AccessRoleRule)
+@receiver(post_delete, sender=AccessRoleRule)
+def invalidate_permission_matrix(sender, **kwargs):
+    """Пересборка матрицы прав после изменения ролей, элементов или правил"""
+    # Версию увеличиваем только после коммита, чтобы другие воркеры не собрали
+    # матрицу из еще не зафиксированных данных
+    transaction.on_commit(permission_matrix.invalidate)
+
+
+@receiver(post_save, sender=AccessRoleRule)
+@receiver(post_delete, sender=AccessRoleRule)
+def rebuild_rule_role_permissions(sender, instance, **kwargs):
+    """Пересборка снимка прав роли, чье правило изменилось"""
+    role_id = instance.role_id
+    transaction.on_commit(lambda: rebuild_role_permissions([role_id]))
+
+
+@receiver(post_save, sender=Role)
+def create_role_permissions(sender, instance, created, **kwargs):
+    if created:
+        role_id = instance.id
+        transaction.on_commit(lambda: rebuild_role_permissions([role_id]))
+
+
+@receiver(post_save, sender=BusinessElement)
+def rebuild_element_role_permissions(sender, instance, created, **kwargs):
+    """Переименованный элемент меняет ключи в снимках ролей, у которых есть на него правила"""
+    if created:
+        return
+    role_ids = list(AccessRoleRule.objects.filter(business_element=instance).values_list('role_id', flat=True))
+    if role_ids:
+        transaction.on_commit(lambda: rebuild_role_permissions(role_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+def publish_user_auth_epoch(sender, instance, **kwargs):
+    """Публикация эпохи пользователя для проверки токенов с claims"""
+    transaction.on_commit(lambda: publish_auth_epoch(instance))
+
+
+@receiver(post_delete, sender=CustomUser)
+def publish_deleted_user_epoch(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: publish_user_deleted(user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_profile(sender, instance, **kwargs):
+    """Сброс кеша профиля при любом сохранении пользователя: API, админка, save()"""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_profile(user_id))
@@ -0,0 +1,22 @@
+from django.core.cache import caches
+from django.test import override_settings
+
+from core.ratelimit import login_rate_limiter
+from core.revocation import revocation_set
+from core.token_cache import token_cache
+
+# Быстрый bcrypt: стоимость хеширования тестам не важна
+fast_hashing = override_settings(BCRYPT_ROUNDS=4)
+
+
+def reset_process_state():
+    """Сброс состояния процесса между тестами: кеши, отозванные токены и лимиты входа"""
+    for cache in caches.all():
+        cache.clear()
+    token_cache.clear()
+    revocation_set.clear()
+    login_rate_limiter.clear()
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
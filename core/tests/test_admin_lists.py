@@ -0,0 +1,66 @@
+from django.test import TestCase
+
+from core.models import CustomUser, Role
+
+from .helpers import bearer, fast_hashing, reset_process_state
+
+
+@fast_hashing
+class AdminListTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        CustomUser.objects.create_user('admin@example.com', 'admin123', is_staff=True)
+        response = self.client.post(
+            '/api/login/', {'email': 'admin@example.com', 'password': 'admin123'}, content_type='application/json'
+        )
+        self.auth = bearer(response.json()['token'])
+        Role.objects.bulk_create(Role(name=f'role_{i:02}') for i in range(10))
+
+    def get(self, url, **headers):
+        return self.client.get(url, **self.auth, **headers)
+
+    def names(self, response):
+        return [row['name'] for row in response.json()['results']]
+
+    def test_cursor_is_stable_under_inserts_and_deletes(self):
+        first = self.get('/api/admin/roles/?limit=4').json()
+        seen = [row['name'] for row in first['results']]
+        self.assertEqual(seen, ['role_00', 'role_01', 'role_02', 'role_03'])
+
+        # Новые строки попадают в конец, удаление уже выданной строки не сдвигает следующую страницу
+        Role.objects.filter(name='role_01').delete()
+        Role.objects.create(name='role_new')
+
+        url = first['next']
+        while url:
+            page = self.get(url).json()
+            seen.extend(row['name'] for row in page['results'])
+            url = page['next']
+        self.assertEqual(seen, [f'role_{i:02}' for i in range(10)] + ['role_new'])
+
+    def test_limit_is_capped(self):
+        Role.objects.bulk_create(Role(name=f'extra_{i}') for i in range(600))
+        self.assertEqual(len(self.get('/api/admin/roles/?limit=1000').json()['results']), 500)
+
+    def test_fields_narrow_response(self):
+        response = self.get('/api/admin/roles/?limit=2&fields=name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'name': 'role_00'}, {'name': 'role_01'}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.get('/api/admin/roles/?fields=nope,name,bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Неизвестные поля: bogus, nope']})
+
+    def test_etag_changes_with_permission_data(self):
+        response = self.get('/api/admin/roles/')
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/admin/roles/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Role.objects.create(name='role_changed')
+        response = self.get('/api/admin/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('role_changed', self.names(response))
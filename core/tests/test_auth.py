@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+
+from core import auth
+from core.models import CustomUser
+
+from .helpers import bearer, fast_hashing, reset_process_state
+
+
+@fast_hashing
+@override_settings(JWT_EMBED_CLAIMS=True)
+class DeletedUserTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        self.user = CustomUser.objects.create_user('user@example.com', 'user123')
+        self.user_id = self.user.pk
+        response = self.client.post(
+            '/api/login/', {'email': 'user@example.com', 'password': 'user123'}, content_type='application/json'
+        )
+        self.token = response.json()['token']
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 200)
+
+    def test_delete_publishes_inactive_epoch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 401)
+
+    def test_profile_of_missing_user_is_401(self):
+        epoch = self.user.auth_epoch
+        self.user.delete()
+        # Другой воркер: профиля нет в кеше, а эпоха удаленного пользователя еще старая
+        reset_process_state()
+        auth._epoch_cache().set(auth._epoch_key(self.user_id), epoch)
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 401)
+        response = self.client.put(
+            '/api/profile/', {'first_name': 'X'}, content_type='application/json', **bearer(self.token)
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+
+@fast_hashing
+@override_settings(JWT_EMBED_CLAIMS=False)
+class TokenCacheWithoutClaimsTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        CustomUser.objects.create_user('user@example.com', 'user123')
+        response = self.client.post(
+            '/api/login/', {'email': 'user@example.com', 'password': 'user123'}, content_type='application/json'
+        )
+        self.token = response.json()['token']
+
+    def test_cached_token_of_deactivated_user_is_rejected_immediately(self):
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 200)
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 200)
+        # Обновление без сигналов: эпоха в кеше не меняется
+        CustomUser.objects.filter(email='user@example.com').update(is_active=False)
+        self.assertEqual(self.client.get('/api/profile/', **bearer(self.token)).status_code, 401)
@@ -0,0 +1,72 @@
+from django.test import TestCase
+
+from core.models import AccessRoleRule, BusinessElement, CustomUser, Role, RolePermissions
+from core.permissions import ACTION_BITS, permission_matrix
+
+from .helpers import bearer, fast_hashing, reset_process_state
+
+
+@fast_hashing
+class AccessRuleBulkTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        CustomUser.objects.create_user('admin@example.com', 'admin123', is_staff=True)
+        response = self.client.post(
+            '/api/login/', {'email': 'admin@example.com', 'password': 'admin123'}, content_type='application/json'
+        )
+        self.auth = bearer(response.json()['token'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager = Role.objects.create(name='manager')
+            self.products = BusinessElement.objects.create(name='products')
+            self.orders = BusinessElement.objects.create(name='orders')
+            AccessRoleRule.objects.create(
+                role=self.manager, business_element=self.products, can_read=True, can_update=True
+            )
+
+    def patch(self, rules):
+        return self.client.patch(
+            '/api/admin/access-rules/bulk/', {'rules': rules}, content_type='application/json', **self.auth
+        )
+
+    def test_creates_and_updates_in_one_request(self):
+        version = permission_matrix.shared_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.patch([
+                {'role': 'manager', 'element': 'products', 'can_delete': True},
+                {'role': 'manager', 'element': 'orders', 'can_read': True},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 1, 'updated': 1})
+
+        # Не переданные флаги сохраняют прежние значения
+        products = AccessRoleRule.objects.get(role=self.manager, business_element=self.products)
+        self.assertEqual((products.can_read, products.can_update, products.can_delete), (True, True, True))
+        orders = AccessRoleRule.objects.get(role=self.manager, business_element=self.orders)
+        self.assertEqual((orders.can_read, orders.can_update), (True, False))
+
+        # Снимок роли и версия матрицы обновлены один раз после коммита
+        masks = RolePermissions.objects.get(role=self.manager).masks
+        self.assertEqual(masks['orders'], ACTION_BITS['read'])
+        self.assertNotEqual(permission_matrix.shared_version(), version)
+
+    def test_invalid_entry_rejects_whole_request(self):
+        response = self.patch([
+            {'role': 'manager', 'element': 'orders', 'can_read': True},
+            {'role': 'ghost', 'element': 'orders'},
+            {'role': 'manager', 'element': 'orders'},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'rules': ['1: роль ghost не найдена', '2: повтор правила manager/orders']})
+        self.assertFalse(AccessRoleRule.objects.filter(business_element=self.orders).exists())
+
+    def test_requires_staff(self):
+        CustomUser.objects.create_user('user@example.com', 'user123')
+        response = self.client.post(
+            '/api/login/', {'email': 'user@example.com', 'password': 'user123'}, content_type='application/json'
+        )
+        response = self.client.patch(
+            '/api/admin/access-rules/bulk/', {'rules': [{'role': 'manager', 'element': 'orders'}]},
+            content_type='application/json', **bearer(response.json()['token'])
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import CustomUser
+from core.sharedstore import SlidingWindowCounter
+
+from .helpers import fast_hashing, reset_process_state
+
+# Окно длиннее теста: граница окна не попадает между попытками
+LONG_WINDOW = 10 ** 9
+
+
+class SlidingWindowCounterTests(SimpleTestCase):
+
+    def test_lockout_doubles_up_to_max(self):
+        counter = SlidingWindowCounter()
+        for _ in range(3):
+            self.assertEqual(counter.hit('k', 3, 600, 30, 100, now=0.0), 0)
+        self.assertEqual(counter.hit('k', 3, 600, 30, 100, now=0.0), 30)
+        # Во время блокировки возвращается оставшееся время
+        self.assertEqual(counter.hit('k', 3, 600, 30, 100, now=10.0), 20)
+        # Попытки в том же окне после блокировки блокируют вдвое дольше, но не дольше max_lockout
+        self.assertEqual(counter.hit('k', 3, 600, 30, 100, now=30.0), 60)
+        self.assertEqual(counter.hit('k', 3, 600, 30, 100, now=90.0), 100)
+
+    def test_previous_window_is_weighted(self):
+        counter = SlidingWindowCounter()
+        for _ in range(4):
+            counter.hit('k', 4, 60, 30, 100, now=0.0)
+        # Середина следующего окна: половина прошлых попыток еще учитывается
+        self.assertEqual(counter.hit('k', 4, 60, 30, 100, now=90.0), 0)
+        self.assertEqual(counter.hit('k', 4, 60, 30, 100, now=90.0), 0)
+        self.assertEqual(counter.hit('k', 4, 60, 30, 100, now=90.0), 30)
+
+    def test_reset_forgets_key(self):
+        counter = SlidingWindowCounter()
+        counter.hit('k', 1, 60, 30, 100, now=0.0)
+        counter.reset('k')
+        self.assertEqual(counter.hit('k', 1, 60, 30, 100, now=0.0), 0)
+
+
+@fast_hashing
+@override_settings(LOGIN_RATE_LIMIT={
+    **settings.LOGIN_RATE_LIMIT,
+    'ENABLED': True,
+    'BACKEND': 'core.ratelimit.LocalRateLimitBackend',
+    'EMAIL': {'LIMIT': 3, 'WINDOW': LONG_WINDOW},
+    'IP': {'LIMIT': 100, 'WINDOW': LONG_WINDOW},
+    'LOCKOUT': 30,
+})
+class LoginRateLimitTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        CustomUser.objects.create_user('user@example.com', 'user123')
+
+    def login(self, password, email='user@example.com'):
+        return self.client.post(
+            '/api/login/', {'email': email, 'password': password}, content_type='application/json'
+        )
+
+    def test_lockout_after_limit_without_db_queries(self):
+        for _ in range(3):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        with self.assertNumQueries(0):
+            response = self.login('user123')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+
+    def test_limit_is_per_email(self):
+        for _ in range(4):
+            self.login('wrong')
+        self.assertEqual(self.login('wrong', email='other@example.com').status_code, 401)
+
+    def test_successful_login_resets_email_counter(self):
+        for _ in range(2):
+            self.login('wrong')
+        self.assertEqual(self.login('user123').status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login('user123').status_code, 200)
@@ -0,0 +1,52 @@
+from django.test import TestCase
+
+from core.models import CustomUser, UserSession
+
+from .helpers import bearer, fast_hashing, reset_process_state
+
+
+@fast_hashing
+class RefreshTokenReuseTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        self.user = CustomUser.objects.create_user('user@example.com', 'user123')
+
+    def login(self):
+        response = self.client.post(
+            '/api/login/', {'email': 'user@example.com', 'password': 'user123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def refresh(self, refresh_token):
+        return self.client.post('/api/token/refresh/', {'refresh': refresh_token}, content_type='application/json')
+
+    def test_rotation_issues_new_pair(self):
+        tokens = self.login()
+        response = self.refresh(tokens['refresh'])
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()
+        self.assertNotEqual(rotated['refresh'], tokens['refresh'])
+        self.assertEqual(self.client.get('/api/profile/', **bearer(rotated['token'])).status_code, 200)
+
+    def test_reuse_closes_session_and_rejects_chain_access_tokens(self):
+        tokens = self.login()
+        rotated = self.refresh(tokens['refresh']).json()
+        # Токен уже проверен и лежит в кеше проверенных токенов
+        self.assertEqual(self.client.get('/api/profile/', **bearer(rotated['token'])).status_code, 200)
+
+        self.assertEqual(self.refresh(tokens['refresh']).status_code, 401)
+
+        self.assertFalse(UserSession.objects.get(user=self.user).is_active)
+        for access_token in (tokens['token'], rotated['token']):
+            self.assertEqual(self.client.get('/api/profile/', **bearer(access_token)).status_code, 401)
+        self.assertEqual(self.refresh(rotated['refresh']).status_code, 401)
+
+    def test_reuse_does_not_affect_other_sessions(self):
+        stolen = self.login()
+        other = self.login()
+        self.refresh(stolen['refresh'])
+        self.refresh(stolen['refresh'])
+        self.assertEqual(self.client.get('/api/profile/', **bearer(other['token'])).status_code, 200)
+        self.assertEqual(self.refresh(other['refresh']).status_code, 200)
@@ -0,0 +1,89 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from core.models import CustomUser, UserSession
+from core.session_recorder import JOURNAL_PATTERN, JournalSegment, recover_journal, session_record, session_recorder
+from core.utils import new_session
+
+from .helpers import bearer, fast_hashing, reset_process_state
+
+
+@fast_hashing
+class SessionWriteBehindTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        self.journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.journal_dir.cleanup)
+        # Фоновый поток не записывает очередь сам: тест управляет записью через flush
+        config = {
+            **settings.SESSION_WRITE_BEHIND,
+            'ENABLED': True, 'INTERVAL': 3600, 'BATCH_SIZE': 10 ** 6, 'JOURNAL_DIR': self.journal_dir.name,
+        }
+        override = override_settings(SESSION_WRITE_BEHIND=config)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(session_recorder.flush)
+        self.user = CustomUser.objects.create_user('user@example.com', 'user123')
+
+    def journal_files(self):
+        return sorted(Path(self.journal_dir.name).glob(JOURNAL_PATTERN))
+
+    def login(self):
+        response = self.client.post(
+            '/api/login/', {'email': 'user@example.com', 'password': 'user123'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_login_defers_insert_until_flush(self):
+        with self.assertNumQueries(1):
+            self.login()
+        self.assertFalse(UserSession.objects.exists())
+        self.assertEqual(len(self.journal_files()), 1)
+
+        self.assertEqual(session_recorder.flush(), 1)
+        self.assertEqual(UserSession.objects.count(), 1)
+        # Журнал порции удаляется после записи в БД
+        self.assertEqual(self.journal_files(), [])
+
+    def test_refresh_and_logout_flush_pending_session(self):
+        tokens = self.login()
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserSession.objects.get().refresh_generation, 1)
+
+        second = self.login()
+        self.assertEqual(self.client.post('/api/logout/', **bearer(second['token'])).status_code, 200)
+        self.assertEqual(UserSession.objects.filter(is_active=False).count(), 1)
+
+    def test_recover_journal_of_finished_process(self):
+        sessions = [new_session(self.user) for _ in range(3)]
+        path = Path(self.journal_dir.name) / 'sessions-1-dead.jsonl'
+        with open(path, 'w', encoding='utf-8') as f:
+            for session in sessions:
+                f.write(json.dumps(session_record(session)) + '\n')
+            # Строка, недописанная при аварийном завершении
+            f.write('{"jti": "')
+
+        self.assertEqual(recover_journal(self.journal_dir.name), 3)
+        self.assertEqual(
+            set(UserSession.objects.values_list('jti', flat=True)), {session.jti for session in sessions}
+        )
+        self.assertFalse(path.exists())
+        # Повторное восстановление не дублирует сессии
+        self.assertEqual(recover_journal(self.journal_dir.name), 0)
+
+    def test_recover_skips_journal_of_live_process(self):
+        segment = JournalSegment(self.journal_dir.name)
+        self.addCleanup(segment.remove)
+        segment.append(session_record(new_session(self.user)))
+
+        self.assertEqual(recover_journal(self.journal_dir.name), 0)
+        self.assertFalse(UserSession.objects.exists())
+        self.assertTrue(segment.path.exists())
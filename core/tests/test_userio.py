@@ -0,0 +1,52 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import CustomUser
+
+from .helpers import fast_hashing
+
+
+@fast_hashing
+class ExportImportRoundTripTests(TestCase):
+
+    def test_round_trip_keeps_flags_and_password(self):
+        CustomUser.objects.create_superuser('root@example.com', 'root123')
+        CustomUser.objects.create_user('user@example.com', 'user123', is_staff=True)
+        expected = {
+            user.email: (user.is_staff, user.is_superuser, user.password)
+            for user in CustomUser.objects.all()
+        }
+
+        with tempfile.TemporaryDirectory() as directory:
+            for fmt in ('jsonl', 'csv'):
+                path = os.path.join(directory, f'users.{fmt}')
+                call_command('export_users', path, stdout=StringIO())
+                CustomUser.objects.all().delete()
+                call_command('import_users', path, workers=1, stdout=StringIO())
+                imported = {
+                    user.email: (user.is_staff, user.is_superuser, user.password)
+                    for user in CustomUser.objects.all()
+                }
+                self.assertEqual(imported, expected)
+
+    def test_existing_and_invalid_records_are_skipped(self):
+        CustomUser.objects.create_user('user@example.com', 'user123')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('{"email": "user@example.com"}\n')
+                f.write('{"email": "new@example.com", "password": "new123"}\n')
+                f.write('{"email": "bad@example.com", "password_hash": "md5$abc"}\n')
+                f.write('{"email": "nopass@example.com"}\n')
+            call_command('import_users', path, workers=1, stdout=StringIO())
+
+        self.assertEqual(
+            set(CustomUser.objects.values_list('email', flat=True)),
+            {'user@example.com', 'new@example.com', 'nopass@example.com'},
+        )
+        self.assertTrue(CustomUser.objects.get(email='new@example.com').check_password('new123'))
+        self.assertFalse(CustomUser.objects.get(email='nopass@example.com').check_password(''))
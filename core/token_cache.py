@@ -0,0 +1,117 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .metrics import registry
+
+cache_lookups = registry.counter(
+    'token_cache_lookups_total',
+    'Обращения к кешу проверенных токенов',
+    labelnames=('result',),
+)
+cache_size = registry.gauge(
+    'token_cache_size',
+    'Число токенов в кеше проверенных токенов',
+)
+
+
+def token_digest(token):
+    """Ключ кеша: дайджест токена вместо самой строки"""
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+
+class VerifiedTokenCache:
+    """Ограниченный LRU-кеш проверенных токенов с истечением по exp"""
+
+    def __init__(self, max_size=None):
+        self._max_size = max_size
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_size(self):
+        if self._max_size is not None:
+            return self._max_size
+        return getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000)
+
+    def get(self, token):
+        """Claims и шаблон пользователя для токена или None"""
+        key = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                cache_lookups.labels(result='miss').inc()
+                return None
+            expires_at, payload, principal = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self.misses += 1
+                cache_lookups.labels(result='miss').inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        cache_lookups.labels(result='hit').inc()
+        return payload, principal
+
+    def set(self, token, payload, principal):
+        max_size = self.max_size
+        if max_size <= 0:
+            return
+        key = token_digest(token)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload.get('exp', 0), payload, principal)
+            self._by_user.setdefault(principal.pk, set()).add(key)
+            while len(self._entries) > max_size:
+                self._remove(next(iter(self._entries)))
+            cache_size.set(len(self._entries))
+
+    def discard(self, token):
+        """Удаление одного токена (выход из системы)"""
+        with self._lock:
+            self._remove(token_digest(token))
+
+    def discard_user(self, user_id):
+        """Удаление всех токенов пользователя (удаление аккаунта)"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+            self.hits = 0
+            self.misses = 0
+        cache_size.set(0)
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        cache_size.set(len(self._entries))
+        user_id = entry[2].pk
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+token_cache = VerifiedTokenCache()
@@ -1,30 +1,70 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from .views import (
-    RegisterView, LoginView, LogoutView,
-    UserProfileView, DeleteAccountView,
+    RegisterView, LoginView, TokenRefreshView, LogoutView,
+    UserProfileView, ProfilePermissionsView, DeleteAccountView,
+    PermissionEvaluateView, JWKSView, MetricsView,
     UsersListView, ProductsListView,
-    RoleListView, AccessRuleListView, AccessRuleDetailView
+    RoleListView, AccessRuleListView, AccessRuleBulkView, AccessRuleDetailView
 )
 
 app_name = 'core'
 
+if settings.ASYNC_VIEWS:
+    # Асинхронные варианты для ASGI; аутентификация по токену, CSRF не нужен
+    from .async_views import (
+        AsyncRegisterView, AsyncLoginView, AsyncTokenRefreshView, AsyncLogoutView,
+        AsyncUserProfileView, AsyncProfilePermissionsView, AsyncDeleteAccountView,
+        AsyncUsersListView, AsyncProductsListView
+    )
+    register_view = csrf_exempt(AsyncRegisterView.as_view())
+    login_view = csrf_exempt(AsyncLoginView.as_view())
+    token_refresh_view = csrf_exempt(AsyncTokenRefreshView.as_view())
+    logout_view = csrf_exempt(AsyncLogoutView.as_view())
+    profile_view = csrf_exempt(AsyncUserProfileView.as_view())
+    profile_permissions_view = AsyncProfilePermissionsView.as_view()
+    delete_account_view = csrf_exempt(AsyncDeleteAccountView.as_view())
+    users_list_view = AsyncUsersListView.as_view()
+    products_list_view = AsyncProductsListView.as_view()
+else:
+    register_view = RegisterView.as_view()
+    login_view = LoginView.as_view()
+    token_refresh_view = TokenRefreshView.as_view()
+    logout_view = LogoutView.as_view()
+    profile_view = UserProfileView.as_view()
+    profile_permissions_view = ProfilePermissionsView.as_view()
+    delete_account_view = DeleteAccountView.as_view()
+    users_list_view = UsersListView.as_view()
+    products_list_view = ProductsListView.as_view()
+
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # Аутентификация
-    path('api/register/', RegisterView.as_view(), name='register'),
-    path('api/login/', LoginView.as_view(), name='login'),
-    path('api/logout/', LogoutView.as_view(), name='logout'),
-    path('api/profile/', UserProfileView.as_view(), name='profile'),
-    path('api/delete-account/', DeleteAccountView.as_view(), name='delete-account'),
+    path('api/register/', register_view, name='register'),
+    path('api/login/', login_view, name='login'),
+    path('api/token/refresh/', token_refresh_view, name='token-refresh'),
+    path('.well-known/jwks.json', JWKSView.as_view(), name='jwks'),
+    path('api/logout/', logout_view, name='logout'),
+    path('api/profile/', profile_view, name='profile'),
+    path('api/profile/permissions/', profile_permissions_view, name='profile-permissions'),
+    path('api/delete-account/', delete_account_view, name='delete-account'),
+
+    # Права доступа
+    path('api/permissions/evaluate/', PermissionEvaluateView.as_view(), name='permissions-evaluate'),
+
+    # Метрики для Prometheus
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 
     # Mock бизнес-объекты
-    path('api/users/', UsersListView.as_view(), name='users-list'),
-    path('api/products/', ProductsListView.as_view(), name='products-list'),
+    path('api/users/', users_list_view, name='users-list'),
+    path('api/products/', products_list_view, name='products-list'),
 
     # Административные эндпоинты
     path('api/admin/roles/', RoleListView.as_view(), name='roles-list'),
     path('api/admin/access-rules/', AccessRuleListView.as_view(), name='access-rules-list'),
+    path('api/admin/access-rules/bulk/', AccessRuleBulkView.as_view(), name='access-rules-bulk'),
     path('api/admin/access-rules/<int:pk>/', AccessRuleDetailView.as_view(), name='access-rule-detail'),
-]
\ No newline at end of file
+]
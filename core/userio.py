@@ -0,0 +1,63 @@
+"""Потоковое чтение и запись пользователей в JSONL/CSV (manage.py import_users/export_users)"""
+import csv
+import json
+import sys
+
+# Поля записи о пользователе; password_hash - готовый хеш bcrypt
+FIELDS = ('email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser', 'role', 'password_hash')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'да'}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+def parse_bool(value, default=False):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def open_input(path):
+    if path == '-':
+        return sys.stdin
+    return open(path, encoding='utf-8', newline='')
+
+
+def open_output(path):
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def read_records(stream, fmt):
+    """Записи по одной, без загрузки файла в память"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class RecordWriter:
+    """Запись пользователей построчно в JSONL или CSV"""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=FIELDS)
+            self._csv.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            self._csv.writerow(record)
+        else:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
@@ -1,34 +1,239 @@
-from .models import CustomUser, AccessRoleRule, BusinessElement
+from .auth import TokenPrincipal, aget_auth_epoch, get_auth_epoch
+from .instrumentation import instrumented
+from .keys import key_ring
+from .models import CustomUser, RolePermissions, UserSession
+from .permissions import ACTION_BITS, ACTIONS, ALL_ACTIONS_MASK, permission_matrix
+from .revocation import revocation_set
+from .session_recorder import session_recorder
+from .token_cache import token_cache
+import hashlib
+import logging
+import time
+import uuid
+from datetime import timedelta
 import jwt
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
 
+logger = logging.getLogger(__name__)
 
-def get_user_from_token(request):
-    """Получение пользователя из JWT токена"""
+
+def get_token_from_request(request):
+    """Извлечение JWT токена из заголовка Authorization"""
     auth_header = request.headers.get('Authorization')
 
     if not auth_header or not auth_header.startswith('Bearer '):
         return None
 
-    token = auth_header.split(' ')[1]
+    return auth_header.split(' ')[1]
 
-    try:
 
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
-        user_id = payload.get('user_id')
-        return CustomUser.objects.get(id=user_id, is_active=True)
-    except (jwt.InvalidTokenError, jwt.ExpiredSignatureError, jwt.DecodeError):
+def decode_token(token, token_type='access'):
+    """Проверка подписи, срока действия и типа токена; None, если токен недействителен"""
+    try:
+        payload = key_ring.decode(token)
+    except jwt.InvalidTokenError:
         # Ошибки JWT токена
         return None
-    except CustomUser.DoesNotExist:
-        # Пользователь не существует
+    # Токены, выданные до появления refresh-токенов, типа не содержат
+    if payload.get('type', 'access') != token_type:
+        return None
+    return payload
+
+
+def uses_claims(payload):
+    """Проверяется ли токен по claims и эпохе, без SELECT пользователя"""
+    return settings.JWT_EMBED_CLAIMS and 'epoch' in payload
+
+
+@instrumented('auth')
+def get_user_from_token(request):
+    """Получение пользователя из JWT токена"""
+    token = get_token_from_request(request)
+    if not token:
         return None
-    except Exception as e:
+
+    try:
+        # Повторно предъявленный токен берем из кеша без проверки подписи
+        cached = token_cache.get(token)
+        if cached is not None:
+            payload, principal = cached
+            if revocation_set.is_revoked(payload.get('jti'), payload.get('sid')):
+                token_cache.discard(token)
+                return None
+            if not uses_claims(payload):
+                # Без claims кеш экономит только проверку подписи: активность
+                # пользователя проверяется в БД на каждом запросе, как и без кеша
+                return CustomUser.objects.filter(id=principal.id, is_active=True).first()
+            # Эпоха перечитывается из БД не реже AUTH_EPOCH_CACHE_TIMEOUT: деактивация в другом
+            # воркере или через QuerySet.update() отклоняет закешированный токен не позже этого срока
+            if get_auth_epoch(principal.id) == principal.auth_epoch:
+                return principal.copy()
+            # Пользователь изменился: проверяем токен заново
+            token_cache.discard(token)
+
+        payload = decode_token(token)
+        if payload is None or revocation_set.is_revoked(payload.get('jti'), payload.get('sid')):
+            return None
+
+        if uses_claims(payload):
+            # Токены с claims проверяются без SELECT пользователя
+            principal = TokenPrincipal.from_claims(payload)
+            if get_auth_epoch(principal.id) != principal.auth_epoch:
+                return None
+            token_cache.set(token, payload, principal)
+            return principal.copy()
+
+        user = CustomUser.objects.filter(id=payload.get('user_id'), is_active=True).first()
+        if user is not None:
+            token_cache.set(token, payload, TokenPrincipal.from_user(user))
+        return user
+    except Exception:
         # Прочие ошибки
-        print(e)
+        logger.exception('Ошибка аутентификации по токену')
+        return None
+
+
+@instrumented('auth')
+async def aget_user_from_token(request):
+    """Асинхронное получение пользователя из JWT токена"""
+    token = get_token_from_request(request)
+    if not token:
         return None
 
+    try:
+        cached = token_cache.get(token)
+        if cached is not None:
+            payload, principal = cached
+            if await revocation_set.ais_revoked(payload.get('jti'), payload.get('sid')):
+                token_cache.discard(token)
+                return None
+            if not uses_claims(payload):
+                return await CustomUser.objects.filter(id=principal.id, is_active=True).afirst()
+            if await aget_auth_epoch(principal.id) == principal.auth_epoch:
+                return principal.copy()
+            token_cache.discard(token)
+
+        payload = decode_token(token)
+        if payload is None or await revocation_set.ais_revoked(payload.get('jti'), payload.get('sid')):
+            return None
+
+        if uses_claims(payload):
+            principal = TokenPrincipal.from_claims(payload)
+            if await aget_auth_epoch(principal.id) != principal.auth_epoch:
+                return None
+            token_cache.set(token, payload, principal)
+            return principal.copy()
+
+        user = await CustomUser.objects.filter(id=payload.get('user_id'), is_active=True).afirst()
+        if user is not None:
+            token_cache.set(token, payload, TokenPrincipal.from_user(user))
+        return user
+    except Exception:
+        logger.exception('Ошибка аутентификации по токену')
+        return None
+
+
+def get_session_key(token):
+    """Ключ сессии для токена: sid, jti или SHA-256 для старых токенов"""
+    try:
+        payload = jwt.decode(token, options={'verify_signature': False})
+    except jwt.DecodeError:
+        payload = {}
+    session_id = payload.get('sid') or payload.get('jti')
+    if session_id:
+        return uuid.UUID(session_id)
+    return uuid.UUID(bytes=hashlib.sha256(token.encode('utf-8')).digest()[:16])
+
+
+def new_session(user):
+    """Новая (еще не сохраненная) сессия пользователя"""
+    return UserSession(
+        user=user,
+        jti=uuid.uuid4(),
+        expires_at=timezone.now() + timedelta(seconds=settings.JWT_REFRESH_TOKEN_LIFETIME)
+    )
+
+
+def issue_tokens(user, session):
+    """Пара access- и refresh-токенов для сессии"""
+    return {
+        'token': user.generate_jwt_token(session_id=session.jti),
+        'refresh': session.generate_refresh_token(),
+    }
+
+
+def rotate_refresh_token(refresh_token):
+    """Обмен refresh-токена на новую пару токенов; None, если токен недействителен
+
+    Каждый refresh-токен принимается один раз. Повторное предъявление уже
+    обмененного токена означает, что он украден: сессия закрывается.
+    """
+    payload = decode_token(refresh_token, token_type='refresh')
+    if payload is None:
+        return None
+    try:
+        session_id = uuid.UUID(payload['sid'])
+        generation = int(payload['gen'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if revocation_set.is_revoked(session_id.hex):
+        return None
 
+    # Сессия, выданная этим процессом, могла еще не дойти до БД
+    session_recorder.flush_pending(jti=session_id)
+    sessions = UserSession.objects.filter(jti=session_id, is_active=True, expires_at__gt=timezone.now())
+    # Поколение сдвигается атомарно: из одновременных обменов одного токена проходит один
+    rotated = sessions.filter(refresh_generation=generation).update(
+        refresh_generation=F('refresh_generation') + 1
+    )
+    if not rotated:
+        if sessions.update(is_active=False):
+            # Access-токены украденной цепочки несут тот же sid и отклоняются сразу
+            revocation_set.revoke(session_id.hex, time.time() + settings.JWT_REFRESH_TOKEN_LIFETIME)
+            logger.warning('Повторное использование refresh-токена, сессия %s закрыта', session_id)
+        return None
+
+    session = UserSession.objects.select_related('user').get(jti=session_id)
+    if not session.user.is_active:
+        return None
+    return issue_tokens(session.user, session)
+
+
+async def arotate_refresh_token(refresh_token):
+    """Асинхронный обмен refresh-токена (запросы к БД выполняются в потоке)"""
+    return await sync_to_async(rotate_refresh_token)(refresh_token)
+
+
+def close_session(session_key):
+    """Закрытие сессии при выходе, в том числе еще не записанной в БД"""
+    session_recorder.flush_pending(jti=session_key)
+    closed = UserSession.objects.filter(jti=session_key, is_active=True).update(is_active=False)
+    if not closed and session_recorder.enabled:
+        # Сессия может ожидать записи в другом воркере: ее refresh-токены отклоняются по sid
+        revocation_set.revoke(session_key.hex, time.time() + settings.JWT_REFRESH_TOKEN_LIFETIME)
+    return closed
+
+
+async def aclose_session(session_key):
+    if session_recorder.enabled:
+        return await sync_to_async(close_session)(session_key)
+    return await UserSession.objects.filter(jti=session_key, is_active=True).aupdate(is_active=False)
+
+
+def revoke_token(token):
+    """Отзыв токена во всех воркерах"""
+    token_cache.discard(token)
+    payload = decode_token(token)
+    if payload is None:
+        # Истекший или поддельный токен отзывать не нужно
+        return
+    revocation_set.revoke(payload.get('jti'), payload['exp'])
+
+
+@instrumented('permission')
 def check_permission(user, business_element_name, action):
     """Проверка прав доступа пользователя"""
     if not user or not user.is_active:
@@ -38,37 +243,81 @@ def check_permission(user, business_element_name, action):
     if user.is_superuser:
         return True
 
-    # Получаем роль пользователя
-    role = user.role
-    if not role:
+    # Берем id роли напрямую, без загрузки связанного объекта
+    role_id = user.role_id
+    if not role_id:
         return False
 
-    # Получаем бизнес-элемент
-    try:
-        business_element = BusinessElement.objects.get(name=business_element_name)
-    except BusinessElement.DoesNotExist:
+    # Права берутся из скомпилированной матрицы без запросов к БД
+    return permission_matrix.has_permission(role_id, business_element_name, action)
+
+
+@instrumented('permission')
+def evaluate_permissions(user, pairs=None):
+    """Проверка набора пар (элемент, действие) за одно обращение к матрице прав
+
+    pairs=None означает все элементы и все действия. Результат: словарь
+    {элемент: битовая маска разрешенных действий из запрошенных}.
+    """
+    requested = {}
+    if pairs is None:
+        for element_name in permission_matrix.element_names():
+            requested[element_name] = ALL_ACTIONS_MASK
+    else:
+        for element_name, action in pairs:
+            requested[element_name] = requested.get(element_name, 0) | ACTION_BITS.get(action, 0)
+
+    if not user or not user.is_active:
+        return dict.fromkeys(requested, 0)
+
+    # Суперпользователь имеет все права
+    if user.is_superuser:
+        return requested
+
+    role_masks = permission_matrix.role_masks(user.role_id) if user.role_id else {}
+    return {
+        element_name: role_masks.get(element_name, 0) & mask
+        for element_name, mask in requested.items()
+    }
+
+
+@instrumented('permission')
+async def acheck_permission(user, business_element_name, action):
+    """Асинхронная проверка прав доступа пользователя"""
+    if not user or not user.is_active:
         return False
 
-    # Получаем правило доступа
-    try:
-        rule = AccessRoleRule.objects.get(role=role, business_element=business_element)
-    except AccessRoleRule.DoesNotExist:
+    if user.is_superuser:
+        return True
+
+    role_id = user.role_id
+    if not role_id:
         return False
 
-    # Проверяем права в зависимости от действия
-    if action == 'read':
-        return rule.can_read
-    elif action == 'create':
-        return rule.can_create
-    elif action == 'update':
-        return rule.can_update
-    elif action == 'delete':
-        return rule.can_delete
-    elif action == 'read_all':
-        return rule.can_read_all
-    elif action == 'update_all':
-        return rule.can_update_all
-    elif action == 'delete_all':
-        return rule.can_delete_all
-
-    return False
\ No newline at end of file
+    return await permission_matrix.ahas_permission(role_id, business_element_name, action)
+
+
+def _profile_permissions(user, masks):
+    # Бит i маски соответствует действию actions[i]
+    return {'role_id': user.role_id, 'actions': ACTIONS, 'permissions': masks or {}}
+
+
+def profile_permissions(user):
+    """Все права пользователя: снимок RolePermissions его роли (один запрос по ключу)"""
+    if user.is_superuser:
+        return _profile_permissions(user, dict.fromkeys(permission_matrix.element_names(), ALL_ACTIONS_MASK))
+    masks = None
+    if user.role_id:
+        masks = RolePermissions.objects.filter(role_id=user.role_id).values_list('masks', flat=True).first()
+    return _profile_permissions(user, masks)
+
+
+async def aprofile_permissions(user):
+    """Асинхронный вариант profile_permissions"""
+    if user.is_superuser:
+        element_names = await sync_to_async(permission_matrix.element_names)()
+        return _profile_permissions(user, dict.fromkeys(element_names, ALL_ACTIONS_MASK))
+    masks = None
+    if user.role_id:
+        masks = await RolePermissions.objects.filter(role_id=user.role_id).values_list('masks', flat=True).afirst()
+    return _profile_permissions(user, masks)
@@ -1,22 +1,65 @@
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from .hashing import HashingPoolSaturated
+from .keys import key_ring
+from .metrics import registry
+from .pagination import KeysetPagination, not_modified, permissions_etag, with_etag
+from .profile_cache import cached_profile, profile_response
+from .ratelimit import login_rate_limiter
 from .models import CustomUser, UserSession, Role, AccessRoleRule
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer,
-    UserUpdateSerializer, RoleSerializer, AccessRoleRuleSerializer,
-    AccessRoleRuleUpdateSerializer
+    UserUpdateSerializer, RoleSerializer, RoleRowSerializer, AccessRuleRowSerializer,
+    AccessRoleRuleUpdateSerializer, AccessRuleBulkSerializer, PermissionEvaluateSerializer,
+    TokenRefreshSerializer, login_data
 )
-from .utils import check_permission
+from .revocation import revocation_set
+from .session_recorder import session_recorder
+from .token_cache import token_cache
+from .policies import route_policy
+from .permissions import ACTIONS, permission_matrix, upsert_access_rules
+from .utils import (
+    close_session, evaluate_permissions, get_session_key, get_token_from_request,
+    issue_tokens, new_session, profile_permissions, revoke_token, rotate_refresh_token
+)
+
+
+def overloaded_response(exc):
+    """Ответ 503, когда пул хеширования паролей перегружен"""
+    return Response(
+        {'error': 'Сервис перегружен, повторите попытку позже'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(exc.retry_after)}
+    )
+
 
+def user_deleted_response():
+    """Ответ 401, когда пользователь удален, а его токен с claims еще проходит проверку эпохи"""
+    return Response({'error': 'Требуется аутентификация'}, status=status.HTTP_401_UNAUTHORIZED)
 
+
+def rate_limited_response(retry_after):
+    """Ответ 429, когда превышен лимит попыток входа"""
+    return Response(
+        {'error': 'Слишком много попыток входа, повторите попытку позже'},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(retry_after)}
+    )
+
+
+@route_policy(public=True)
 class RegisterView(APIView):
     """Регистрация пользователя"""
 
     def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
+            try:
+                user = serializer.save()
+            except HashingPoolSaturated as e:
+                return overloaded_response(e)
             return Response({
                 'message': 'Пользователь успешно зарегистрирован',
                 'user_id': user.id
@@ -24,6 +67,7 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@route_policy(public=True)
 class LoginView(APIView):
     """Вход в систему"""
 
@@ -35,50 +79,65 @@ class LoginView(APIView):
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
 
+        # Лимит проверяется до обращения к БД и bcrypt
+        retry_after = login_rate_limiter.check(request, email)
+        if retry_after:
+            return rate_limited_response(retry_after)
+
         try:
             user = CustomUser.objects.get(email=email, is_active=True)
         except CustomUser.DoesNotExist:
             return Response({'error': 'Неверные учетные данные'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        if not user.check_password(password):
+        try:
+            password_valid = user.check_password(password)
+        except HashingPoolSaturated as e:
+            return overloaded_response(e)
+
+        if not password_valid:
             return Response({'error': 'Неверные учетные данные'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Генерируем JWT токен
-        token = user.generate_jwt_token()
+        # Пересоздаем хеш, если стоимость bcrypt в настройках изменилась
+        if user.password_needs_rehash():
+            try:
+                user.set_password(password)
+                user.save(update_fields=['password'])
+            except HashingPoolSaturated:
+                # Не мешаем входу: хеш обновится при следующем входе
+                pass
+
+        login_rate_limiter.reset(email)
 
-        # Сохраняем сессию
-        from datetime import datetime, timedelta
-        expires_at = datetime.now() + timedelta(days=1)
-        UserSession.objects.create(
-            user=user,
-            token=token,
-            expires_at=expires_at
-        )
+        # Сохраняем сессию и выдаем пару токенов
+        session = new_session(user)
+        session_recorder.record(session)
 
-        return Response({
-            'token': token,
-            'user': {
-                'id': user.id,
-                'email': user.email,
-                'first_name': user.first_name,
-                'last_name': user.last_name
-            }
-        })
+        return Response(login_data(user, issue_tokens(user, session)))
+
+
+@route_policy(public=True)
+class TokenRefreshView(APIView):
+    """Обмен refresh-токена на новую пару токенов"""
+
+    def post(self, request):
+        serializer = TokenRefreshSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        tokens = rotate_refresh_token(serializer.validated_data['refresh'])
+        if tokens is None:
+            return Response({'error': 'Недействительный refresh-токен'}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(tokens)
 
 
 class LogoutView(APIView):
     """Выход из системы"""
 
     def post(self, request):
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            try:
-                session = UserSession.objects.get(token=token, is_active=True)
-                session.is_active = False
-                session.save()
-            except UserSession.DoesNotExist:
-                pass
+        token = get_token_from_request(request)
+        if token:
+            revoke_token(token)
+            close_session(get_session_key(token))
 
         return Response({'message': 'Успешный выход из системы'})
 
@@ -87,17 +146,32 @@ class UserProfileView(APIView):
     """Профиль пользователя"""
 
     def get(self, request):
-        serializer = UserUpdateSerializer(request.user)
-        return Response(serializer.data)
+        user_id = request.user.pk
+        try:
+            entry = cached_profile(user_id)
+        except CustomUser.DoesNotExist:
+            return user_deleted_response()
+        # 304 отдается по записи кеша, до сериализации и запросов к БД
+        return profile_response(request, user_id, entry, permission_matrix.shared_version())
 
     def put(self, request):
         serializer = UserUpdateSerializer(request.user, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data)
+        try:
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data)
+        except CustomUser.DoesNotExist:
+            return user_deleted_response()
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProfilePermissionsView(APIView):
+    """Все действующие права текущего пользователя одним запросом к снимку роли"""
+
+    def get(self, request):
+        return Response(profile_permissions(request.user))
+
+
 class DeleteAccountView(APIView):
     """Удаление аккаунта"""
 
@@ -106,20 +180,39 @@ class DeleteAccountView(APIView):
         user.is_active = False
         user.save()
 
-        # Деактивируем все сессии пользователя
-        UserSession.objects.filter(user=user, is_active=True).update(is_active=False)
+        # Деактивируем все сессии пользователя и отзываем их sid: access- и refresh-токены
+        # этих сессий отклоняются во всех воркерах, не дожидаясь обновления эпохи
+        session_recorder.flush_pending(user_id=user.pk)
+        sessions = UserSession.objects.filter(user_id=user.pk, is_active=True)
+        for jti, expires_at in sessions.values_list('jti', 'expires_at'):
+            revocation_set.revoke(jti.hex, expires_at.timestamp())
+        sessions.update(is_active=False)
+        token_cache.discard_user(user.pk)
 
         return Response({'message': 'Аккаунт успешно удален'})
 
 
+class PermissionEvaluateView(APIView):
+    """Проверка прав текущего пользователя на набор (элемент, действие)"""
+
+    def post(self, request):
+        serializer = PermissionEvaluateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Бит i маски соответствует действию actions[i]
+        return Response({
+            'actions': ACTIONS,
+            'permissions': evaluate_permissions(request.user, serializer.validated_data['pairs'])
+        })
+
+
 # Mock views для бизнес-объектов
+@route_policy(element='users', action={'GET': 'read'})
 class UsersListView(APIView):
     """Mock view для списка пользователей"""
 
     def get(self, request):
-        if not check_permission(request.user, 'users', 'read'):
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
         # Mock данные
         mock_data = [
             {'id': 1, 'name': 'User 1', 'email': 'user1@example.com'},
@@ -128,13 +221,11 @@ class UsersListView(APIView):
         return Response(mock_data)
 
 
+@route_policy(element='products', action={'GET': 'read'})
 class ProductsListView(APIView):
     """Mock view для списка товаров"""
 
     def get(self, request):
-        if not check_permission(request.user, 'products', 'read'):
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
         # Mock данные
         mock_data = [
             {'id': 1, 'name': 'Product 1', 'price': 100},
@@ -144,21 +235,21 @@ class ProductsListView(APIView):
 
 
 # Административные views для управления правами доступа
+@route_policy(staff=True)
 class RoleListView(APIView):
     """Список ролей (только для администраторов)"""
 
     def get(self, request):
-        if not request.user.is_staff:
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
-        roles = Role.objects.all()
-        serializer = RoleSerializer(roles, many=True)
-        return Response(serializer.data)
+        etag = permissions_etag(request)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        paginator = KeysetPagination()
+        serializer = RoleRowSerializer(request)
+        roles = paginator.paginate_queryset(serializer.values(Role.objects.all()), request, view=self)
+        return with_etag(paginator.get_paginated_response(serializer.rows(roles)), etag)
 
     def post(self, request):
-        if not request.user.is_staff:
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
         serializer = RoleSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -166,25 +257,26 @@ class RoleListView(APIView):
         return Response(serializer.errors, status=400)
 
 
+@route_policy(staff=True)
 class AccessRuleListView(APIView):
     """Список правил доступа (только для администраторов)"""
 
     def get(self, request):
-        if not request.user.is_staff:
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
-        rules = AccessRoleRule.objects.all()
-        serializer = AccessRoleRuleSerializer(rules, many=True)
-        return Response(serializer.data)
+        etag = permissions_etag(request)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        paginator = KeysetPagination()
+        serializer = AccessRuleRowSerializer(request)
+        rules = paginator.paginate_queryset(serializer.values(AccessRoleRule.objects.all()), request, view=self)
+        return with_etag(paginator.get_paginated_response(serializer.rows(rules)), etag)
 
 
+@route_policy(staff=True)
 class AccessRuleDetailView(APIView):
     """Детальное представление правила доступа (только для администраторов)"""
 
     def put(self, request, pk):
-        if not request.user.is_staff:
-            return Response({'error': 'Доступ запрещен'}, status=403)
-
         try:
             rule = AccessRoleRule.objects.get(pk=pk)
         except AccessRoleRule.DoesNotExist:
@@ -194,4 +286,34 @@ class AccessRuleDetailView(APIView):
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
-        return Response(serializer.errors, status=400)
\ No newline at end of file
+        return Response(serializer.errors, status=400)
+
+
+@route_policy(staff=True)
+class AccessRuleBulkView(APIView):
+    """Массовое создание и обновление правил доступа (только для администраторов)"""
+
+    def patch(self, request):
+        serializer = AccessRuleBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=400)
+        created, updated = upsert_access_rules(serializer.validated_data['rules'])
+        return Response({'created': created, 'updated': updated})
+
+
+@route_policy(public=True)
+class JWKSView(APIView):
+    """Открытые ключи подписи токенов для проверки в других сервисах"""
+
+    def get(self, request):
+        response = HttpResponse(key_ring.jwks(), content_type='application/json')
+        response['Cache-Control'] = 'public, max-age=300'
+        return response
+
+
+@route_policy(staff=True)
+class MetricsView(APIView):
+    """Метрики процесса в текстовом формате Prometheus (только для администраторов)"""
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
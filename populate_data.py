@@ -1,10 +1,21 @@
+import argparse
 import os
+import random
+import time
+
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.db import transaction
+
+from core.hashing import hash_password
 from core.models import Role, BusinessElement, AccessRoleRule, CustomUser
+from core.permissions import RULE_FIELDS, permission_matrix, rebuild_role_permissions
+
+# Домен синтетических пользователей: по нему их легко найти и удалить
+LOAD_EMAIL_DOMAIN = 'load.example.com'
 
 
 def populate_data():
@@ -133,5 +144,93 @@ def populate_data():
     print("Данные успешно заполнены!")
 
 
+def generate_dataset(users=0, roles=0, elements=0, rule_density=0.5, seed=0,
+                     batch_size=5000, rounds=4, password='load123'):
+    """Синтетический набор данных: роли, бизнес-элементы, правила и пользователи
+
+    Повторный запуск с теми же параметрами ничего не дублирует: имена и email
+    детерминированы, а bulk_create пропускает уже существующие строки.
+    """
+    rng = random.Random(seed)
+
+    Role.objects.bulk_create(
+        [Role(name=f'load_role_{i}', description='Синтетическая роль') for i in range(roles)],
+        ignore_conflicts=True,
+    )
+    BusinessElement.objects.bulk_create(
+        [BusinessElement(name=f'load_element_{i}', description='Синтетический элемент') for i in range(elements)],
+        ignore_conflicts=True,
+    )
+    role_ids = list(Role.objects.filter(name__startswith='load_role_').order_by('id').values_list('id', flat=True))
+    element_ids = list(
+        BusinessElement.objects.filter(name__startswith='load_element_').order_by('id').values_list('id', flat=True)
+    )
+
+    # Каждая пара (роль, элемент) получает правило с вероятностью rule_density
+    rules = []
+    for role_id in role_ids:
+        for element_id in element_ids:
+            if rng.random() >= rule_density:
+                continue
+            flags = {field: rng.random() < 0.5 for field in RULE_FIELDS}
+            flags['can_read'] = True
+            rules.append(AccessRoleRule(role_id=role_id, business_element_id=element_id, **flags))
+    AccessRoleRule.objects.bulk_create(rules, batch_size=batch_size, ignore_conflicts=True)
+    # bulk_create не отправляет сигналы, поэтому снимки прав ролей и матрицу обновляем сами
+    rebuild_role_permissions(role_ids)
+    if rules:
+        permission_matrix.invalidate()
+    print(f'Ролей: {len(role_ids)}, элементов: {len(element_ids)}, правил: {len(rules)}')
+
+    if not users:
+        return
+
+    # Один хеш с низкой стоимостью на всех синтетических пользователей: bcrypt не вызывается на каждого
+    password_hash = hash_password(password, rounds=rounds)
+    started = time.perf_counter()
+    for start in range(0, users, batch_size):
+        batch = [
+            CustomUser(
+                email=f'user{i}@{LOAD_EMAIL_DOMAIN}',
+                first_name=f'User{i}',
+                last_name='Load',
+                password=password_hash,
+                role_id=rng.choice(role_ids) if role_ids else None,
+            )
+            for i in range(start, min(start + batch_size, users))
+        ]
+        with transaction.atomic():
+            CustomUser.objects.bulk_create(batch, ignore_conflicts=True)
+        done = start + len(batch)
+        elapsed = time.perf_counter() - started
+        print(f'Пользователей: {done}/{users} ({done / elapsed:.0f}/с)')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Заполнение БД тестовыми и синтетическими данными')
+    parser.add_argument('--users', type=int, default=0, help='Число синтетических пользователей')
+    parser.add_argument('--roles', type=int, default=0, help='Число синтетических ролей')
+    parser.add_argument('--elements', type=int, default=0, help='Число синтетических бизнес-элементов')
+    parser.add_argument('--rule-density', type=float, default=0.5,
+                        help='Доля пар (роль, элемент), для которых создается правило')
+    parser.add_argument('--seed', type=int, default=0, help='Зерно генератора для воспроизводимости')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Строк в одном bulk_create')
+    parser.add_argument('--rounds', type=int, default=4, help='Стоимость bcrypt для синтетических пользователей')
+    parser.add_argument('--password', default='load123', help='Пароль всех синтетических пользователей')
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
     populate_data()
+    if args.users or args.roles or args.elements:
+        generate_dataset(
+            users=args.users,
+            roles=args.roles,
+            elements=args.elements,
+            rule_density=args.rule_density,
+            seed=args.seed,
+            batch_size=args.batch_size,
+            rounds=args.rounds,
+            password=args.password,
+        )